@@ -0,0 +1,57 @@
+import os
+import subprocess
+import sys
+import time
+from typing import Callable
+
+FUNCTION_TEMPLATE = """\
+/* helper number {index} */
+int helper{index}(int x, int *y) {{
+  int total = 0;
+  int values[8];
+  char *label = "helper{index}: %d\\n";
+  // walk the values and accumulate them
+  for (total = 0; total <= 7; total = total + 1) {{
+    values[total] = x * {index} + total - 4 / 2;
+  }}
+  while (x >= 1) {{
+    x = x - 1;
+    if (x == 3 != 0) total = total + values[x - x];
+    else total = total - *y;
+  }}
+  return total + label[0];
+}}
+"""
+
+
+def generate_program(functions: int) -> str:
+    results = [FUNCTION_TEMPLATE.format(index=index) for index in range(functions)]
+    results.append("int main() {\n  return 0;\n}\n")
+    return "".join(results)
+
+
+def best_of(repeat: int, func: Callable[[], object]) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def build_executable(source: str, directory: str, name: str, *flags: str) -> str:
+    source_path = os.path.join(directory, f"{name}.c")
+    assembly_path = os.path.join(directory, f"{name}.s")
+    executable_path = os.path.join(directory, name)
+    with open(source_path, "w") as f:
+        f.write(source)
+    subprocess.run(
+        [sys.executable, "main.py", *flags, "-o", assembly_path, source_path],
+        check=True,
+    )
+    subprocess.run(["cc", "-o", executable_path, assembly_path], check=True)
+    return executable_path
+
+
+def run_executable(path: str) -> None:
+    subprocess.run([path], check=True)
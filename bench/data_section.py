@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import click
+
+STRING_TEMPLATE = (
+    '  x = "entry {index}: the quick brown fox jumps over the lazy dog\\n";\n'
+)
+
+
+def generate_string_table(strings: int) -> str:
+    results = ["int g[1024];\nint main() {\n  char *x;\n"]
+    results.extend(STRING_TEMPLATE.format(index=index) for index in range(strings))
+    results.append("  return 0;\n}\n")
+    return "".join(results)
+
+
+@click.command()
+@click.option("--strings", default=20000, help="number of string literals")
+def main(strings: int):
+    with tempfile.TemporaryDirectory() as directory:
+        source_path = os.path.join(directory, "input.c")
+        assembly_path = os.path.join(directory, "input.s")
+        object_path = os.path.join(directory, "input.o")
+        with open(source_path, "w") as f:
+            f.write(generate_string_table(strings))
+        subprocess.run(
+            [sys.executable, "main.py", "-g0", "-o", assembly_path, source_path],
+            check=True,
+        )
+        start = time.perf_counter()
+        subprocess.run(["cc", "-c", "-o", object_path, assembly_path], check=True)
+        elapsed = time.perf_counter() - start
+        click.echo(
+            f"data: .s {os.path.getsize(assembly_path) / 1e6:.2f} MB, "
+            f".o {os.path.getsize(object_path) / 1e6:.2f} MB, assemble {elapsed:.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import click
+
+from bench.common import generate_program
+
+
+@click.command()
+@click.option("--functions", default=2000, help="number of generated functions")
+def main(functions: int):
+    with tempfile.TemporaryDirectory() as directory:
+        source_path = os.path.join(directory, "input.c")
+        with open(source_path, "w") as f:
+            f.write(generate_program(functions))
+        for level in (0, 1, 2):
+            assembly_path = os.path.join(directory, f"g{level}.s")
+            object_path = os.path.join(directory, f"g{level}.o")
+            start = time.perf_counter()
+            subprocess.run(
+                [
+                    sys.executable,
+                    "main.py",
+                    f"-g{level}",
+                    "-o",
+                    assembly_path,
+                    source_path,
+                ],
+                check=True,
+            )
+            compiled = time.perf_counter()
+            subprocess.run(["cc", "-c", "-o", object_path, assembly_path], check=True)
+            assembled = time.perf_counter()
+            click.echo(
+                f"-g{level}: .s {os.path.getsize(assembly_path) / 1e6:.2f} MB, "
+                f"compile {compiled - start:.2f}s, assemble {assembled - compiled:.2f}s, "
+                f"total {assembled - start:.2f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
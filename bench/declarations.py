@@ -0,0 +1,34 @@
+import click
+
+from bench.common import best_of
+from nadeshiko.parse import Parse
+from nadeshiko.tokenize import tokenize
+
+
+def generate_declarations(count: int) -> str:
+    results = []
+    for index in range(count):
+        if index % 2:
+            results.append(f"int *global{index}, table{index}[4];\n")
+        else:
+            results.append(f"int function{index}(int x) {{ return x + {index}; }}\n")
+    return "".join(results)
+
+
+@click.command()
+@click.option("--start", default=1000, help="smallest number of declarations")
+@click.option("--steps", default=4, help="number of doublings")
+@click.option("--repeat", default=3)
+def main(start: int, steps: int, repeat: int):
+    for step in range(steps):
+        count = start << step
+        source = generate_declarations(count)
+        elapsed = best_of(repeat, lambda: Parse(tokenize(source)).parse_stmt())
+        click.echo(
+            f"declarations: {count:>7}, {elapsed:.3f}s, "
+            f"{elapsed / count * 1e6:.1f}us per declaration"
+        )
+
+
+if __name__ == "__main__":
+    main()
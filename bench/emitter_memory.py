@@ -0,0 +1,40 @@
+import io
+import os
+import tracemalloc
+
+import click
+
+from bench.common import generate_program
+from nadeshiko.emitter import Emitter, DEFAULT_FLUSH_SIZE
+from nadeshiko.ir import lower_program
+from nadeshiko.ir_codegen import ir_codegen
+from nadeshiko.parse import Parse
+from nadeshiko.tokenize import tokenize
+
+
+@click.command()
+@click.option("--functions", default=2000, help="number of generated functions")
+@click.option("--flush-size", default=DEFAULT_FLUSH_SIZE, help="emitter flush size")
+def main(functions: int, flush_size: int):
+    source = generate_program(functions)
+    prog = Parse(tokenize(source)).parse_stmt()
+
+    with open(os.devnull, "w") as output:
+        emitter = Emitter(output, flush_size)
+        tracemalloc.start()
+        ir_codegen("bench.c", prog, lower_program(prog), emitter)
+        emitter.flush()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    size = io.StringIO()
+    prog = Parse(tokenize(source)).parse_stmt()
+    emitter = Emitter(size, flush_size)
+    ir_codegen("bench.c", prog, lower_program(prog), emitter)
+    emitter.flush()
+    click.echo(f"codegen peak memory: {peak / 1024:.1f} KiB")
+    click.echo(f"  for {len(size.getvalue()) / 1024:.1f} KiB of assembly")
+
+
+if __name__ == "__main__":
+    main()
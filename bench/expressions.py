@@ -0,0 +1,28 @@
+import click
+
+from bench.common import best_of
+from nadeshiko.parse import Parse
+from nadeshiko.tokenize import tokenize
+
+
+def generate_expressions(operands: int) -> str:
+    terms = [f"x * {index} - {index} / 2 < x" for index in range(operands)]
+    values = ", ".join(["x"] * operands)
+    return f"int main() {{ int x; x = {' + '.join(terms)}; x = ({values}); return x; }}"
+
+
+@click.command()
+@click.option("--operands", default=20000, help="operands per expression")
+@click.option("--repeat", default=3)
+def main(operands: int, repeat: int):
+    source = generate_expressions(operands)
+    tokens = list(tokenize(source))
+    elapsed = best_of(repeat, lambda: Parse(tokens).parse_stmt())
+    click.echo(
+        f"expressions: {operands} operands, {elapsed:.3f}s, "
+        f"{elapsed / operands * 1e6:.1f}us per operand"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import tempfile
+
+import click
+
+from bench.common import best_of, build_executable, run_executable
+
+HELPER_PROGRAM = """\
+int add2(int x, int y) {
+  return x + y;
+}
+
+int scale(int x) {
+  int doubled = x + x;
+  return doubled - x / 4;
+}
+
+int main() {
+  int i=0; int total=0;
+  for (i=0; i<%(iterations)d; i=i+1) total = add2(total, scale(i)) - total;
+  return 0;
+}
+"""
+
+
+@click.command()
+@click.option("--iterations", default=20000000, help="loop trip count")
+@click.option("--repeat", default=5)
+def main(iterations: int, repeat: int):
+    source = HELPER_PROGRAM % {"iterations": iterations}
+    with tempfile.TemporaryDirectory() as directory:
+        baseline = build_executable(
+            source, directory, "baseline", "-O", "--inline-budget=0"
+        )
+        inlined = build_executable(source, directory, "inlined", "-O")
+        before = best_of(repeat, lambda: run_executable(baseline))
+        after = best_of(repeat, lambda: run_executable(inlined))
+    click.echo(f"helpers: {before:.3f}s with calls, {after:.3f}s inlined")
+    click.echo(f"  {before / after:.2f}x speedup")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import io
+import os
+import subprocess
+import tempfile
+
+import click
+
+from bench.common import best_of
+from nadeshiko.assembler import assemble
+from nadeshiko.emitter import Emitter, DEFAULT_FLUSH_SIZE
+from nadeshiko.ir import lower_program
+from nadeshiko.ir_codegen import ir_codegen
+from nadeshiko.jit import libc, load, run_main
+from nadeshiko.parse import Parse
+from nadeshiko.tokenize import tokenize
+
+PROGRAM_TEMPLATE = """\
+int square(int x) {{ return x * x; }}
+int main() {{
+  int total = 0;
+  int i;
+  for (i = 0; i < {index}; i = i + 1) total = total + square(i);
+  return total;
+}}
+"""
+
+
+def compile_program(source: str) -> str:
+    output = io.StringIO()
+    emitter = Emitter(output, DEFAULT_FLUSH_SIZE)
+    prog = Parse(tokenize(source)).parse_stmt()
+    ir_codegen("bench.c", prog, lower_program(prog), emitter)
+    emitter.flush()
+    return output.getvalue()
+
+
+@click.command()
+@click.option("--programs", default=200, help="number of generated programs")
+@click.option("--repeat", default=3)
+def main(programs: int, repeat: int):
+    sources = [PROGRAM_TEMPLATE.format(index=index) for index in range(programs)]
+    with tempfile.TemporaryDirectory() as directory:
+        assembly_path = os.path.join(directory, "program.s")
+        executable_path = os.path.join(directory, "program")
+        results = {}
+
+        def build_and_execute() -> None:
+            for source in sources:
+                with open(assembly_path, "w") as f:
+                    f.write(compile_program(source))
+                subprocess.run(
+                    ["cc", "-o", executable_path, assembly_path],
+                    check=True,
+                    stderr=subprocess.DEVNULL,
+                )
+                results[source] = subprocess.run([executable_path]).returncode
+
+        def run_in_process() -> None:
+            for source in sources:
+                program = load(assemble(compile_program(source)), [libc()])
+                assert run_main(program) & 0xFF == results[source]
+
+        before = best_of(repeat, build_and_execute)
+        after = best_of(repeat, run_in_process)
+    click.echo(
+        f"jit: {programs} programs, {before:.3f}s through cc and exec, "
+        f"{after:.3f}s jitted in-process"
+    )
+    click.echo(f"  {before / after:.2f}x speedup")
+
+
+if __name__ == "__main__":
+    main()
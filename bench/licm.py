@@ -0,0 +1,36 @@
+import tempfile
+
+import click
+
+from bench.common import best_of, build_executable, run_executable
+
+GRID_PROGRAM = """\
+int grid[64][64];
+
+int main() {
+  int pass=0; int r=0; int c=0; int total=0;
+  for (pass=0; pass<%(passes)d; pass=pass+1)
+    for (r=0; r<64; r=r+1)
+      for (c=0; c<64; c=c+1)
+        total = total + grid[r][c] + grid[pass - pass/64*64][r];
+  return 0;
+}
+"""
+
+
+@click.command()
+@click.option("--passes", default=50000, help="walks over the whole grid")
+@click.option("--repeat", default=5)
+def main(passes: int, repeat: int):
+    source = GRID_PROGRAM % {"passes": passes}
+    with tempfile.TemporaryDirectory() as directory:
+        baseline = build_executable(source, directory, "baseline", "-O", "--no-licm")
+        hoisted = build_executable(source, directory, "hoisted", "-O")
+        before = best_of(repeat, lambda: run_executable(baseline))
+        after = best_of(repeat, lambda: run_executable(hoisted))
+    click.echo(f"grid: {before:.3f}s without licm, {after:.3f}s with licm")
+    click.echo(f"  {before / after:.2f}x speedup")
+
+
+if __name__ == "__main__":
+    main()
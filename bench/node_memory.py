@@ -0,0 +1,28 @@
+import tracemalloc
+
+import click
+
+from bench.common import generate_program
+from nadeshiko.node import count_nodes
+from nadeshiko.parse import Parse
+from nadeshiko.tokenize import tokenize
+
+
+@click.command()
+@click.option("--functions", default=2000, help="number of generated functions")
+def main(functions: int):
+    source = generate_program(functions)
+    tokens = list(tokenize(source))
+
+    tracemalloc.start()
+    prog = Parse(tokens).parse_stmt()
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    nodes = count_nodes(prog)
+    click.echo(f"node memory: {nodes} nodes, {len(prog)} top-level objects")
+    click.echo(f"  {used / nodes:.1f} bytes per node, including types and objects")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+import tempfile
+
+import click
+
+from bench.common import best_of, generate_program
+
+
+@click.command()
+@click.option("--functions", default=500, help="number of generated functions")
+@click.option("--repeat", default=3)
+def main(functions: int, repeat: int):
+    with tempfile.TemporaryDirectory() as directory:
+        source_path = os.path.join(directory, "input.c")
+        assembly_path = os.path.join(directory, "input.s")
+        object_path = os.path.join(directory, "input.o")
+        with open(source_path, "w") as f:
+            f.write(generate_program(functions))
+
+        def through_assembler() -> None:
+            subprocess.run(
+                [sys.executable, "main.py", "-o", assembly_path, source_path],
+                check=True,
+            )
+            subprocess.run(["cc", "-c", "-o", object_path, assembly_path], check=True)
+
+        def direct() -> None:
+            subprocess.run(
+                [sys.executable, "main.py", "-c", "-o", object_path, source_path],
+                check=True,
+            )
+
+        before = best_of(repeat, through_assembler)
+        after = best_of(repeat, direct)
+    click.echo(f"objects: {before:.3f}s through cc -c, {after:.3f}s with -c")
+    click.echo(f"  {before / after:.2f}x speedup")
+
+
+if __name__ == "__main__":
+    main()
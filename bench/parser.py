@@ -0,0 +1,67 @@
+from contextlib import contextmanager
+from typing import Iterator
+
+import click
+
+from bench.common import generate_program, best_of
+from nadeshiko import parse
+from nadeshiko.parse import Parse
+from nadeshiko.token import KEYWORD_IDS, PUNCTUATOR_IDS, Token, TokenId
+from nadeshiko.tokenize import tokenize
+from nadeshiko.utils import Peekable
+
+SPELLINGS = {
+    token_id: text for text, token_id in (PUNCTUATOR_IDS | KEYWORD_IDS).items()
+}
+
+
+def equal_by_expression(token: Token, token_id: TokenId) -> bool:
+    return token.expression == SPELLINGS[token_id]
+
+
+def skip_by_expression(token: Token, token_id: TokenId) -> None:
+    assert token.expression == SPELLINGS[token_id]
+
+
+def consume_by_expression(tokens: Peekable[Token], token_id: TokenId) -> bool:
+    if equal_by_expression(tokens.peek(), token_id):
+        next(tokens)
+        return True
+    return False
+
+
+@contextmanager
+def string_equality() -> Iterator[None]:
+    saved = parse.equal, parse.skip, parse.consume
+    parse.equal = equal_by_expression
+    parse.skip = skip_by_expression
+    parse.consume = consume_by_expression
+    try:
+        yield
+    finally:
+        parse.equal, parse.skip, parse.consume = saved
+
+
+@click.command()
+@click.option("--functions", default=2000, help="number of generated functions")
+@click.option("--repeat", default=3)
+def main(functions: int, repeat: int):
+    source = generate_program(functions)
+    tokens = list(tokenize(source))
+    lexed = best_of(repeat, lambda: list(tokenize(source)))
+    parsed = best_of(repeat, lambda: Parse(tokens).parse_stmt())
+    with string_equality():
+        by_expression = best_of(repeat, lambda: Parse(tokens).parse_stmt())
+    streamed = best_of(repeat, lambda: Parse(tokenize(source)).parse_stmt())
+    click.echo(
+        f"parser: {len(tokens)} tokens, {parsed:.3f}s, "
+        f"{len(tokens) / parsed / 1e3:.0f}k tokens/s"
+    )
+    click.echo(f"  token matching via string equality: {by_expression:.3f}s")
+    click.echo(f"  token matching via token id identity: {parsed:.3f}s")
+    click.echo(f"  tokenize alone: {lexed:.3f}s")
+    click.echo(f"  tokenize and parse, streamed: {streamed:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
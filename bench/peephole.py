@@ -0,0 +1,64 @@
+import glob
+import os
+import subprocess
+import sys
+import tempfile
+
+import click
+
+from bench.common import best_of
+from bench.regalloc import LOOP_PROGRAM
+
+
+def build(source_path: str, directory: str, name: str, *flags: str) -> tuple[int, str]:
+    assembly_path = os.path.join(directory, f"{name}.s")
+    executable_path = os.path.join(directory, name)
+    source = subprocess.run(
+        ["cc", "-E", "-P", "-C", source_path],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    subprocess.run(
+        [sys.executable, "main.py", *flags, "-o", assembly_path, "-"],
+        input=source,
+        check=True,
+        text=True,
+    )
+    subprocess.run(
+        ["cc", "-o", executable_path, assembly_path, "-xc", "test/common"],
+        check=True,
+        capture_output=True,
+    )
+    return os.path.getsize(assembly_path), executable_path
+
+
+def run_quietly(path: str) -> None:
+    subprocess.run([path], check=True, stdout=subprocess.DEVNULL)
+
+
+@click.command()
+@click.option("--iterations", default=2000000, help="loop trip count per call")
+@click.option("--repeat", default=5)
+def main(iterations: int, repeat: int):
+    with tempfile.TemporaryDirectory() as directory:
+        loop_path = os.path.join(directory, "loops.c")
+        with open(loop_path, "w") as f:
+            f.write(LOOP_PROGRAM % {"iterations": iterations})
+        for path in sorted(glob.glob("test/*.c")) + [loop_path]:
+            name = os.path.basename(path)[:-2]
+            before_size, before = build(
+                path, directory, f"{name}-before", "-O", "--no-peephole"
+            )
+            after_size, after = build(path, directory, f"{name}-after", "-O")
+            before_time = best_of(repeat, lambda: run_quietly(before))
+            after_time = best_of(repeat, lambda: run_quietly(after))
+            click.echo(
+                f"{name}: .s {before_size} -> {after_size} bytes "
+                f"({1 - after_size / before_size:.1%} smaller), "
+                f"run {before_time * 1000:.2f} -> {after_time * 1000:.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import tempfile
+
+import click
+
+from bench.common import best_of, build_executable, run_executable
+
+LOOP_PROGRAM = """\
+int sum(int n) {
+  int i=0; int j=0; int k=0;
+  for (i=0; i<n; i=i+1) { j=i+j; k=k+j-i; }
+  return j+k;
+}
+
+int count(int n) {
+  int i=0; int j=0;
+  while (i<n) { if (i-i/2*2==0) j=j+1; i=i+1; }
+  return j;
+}
+
+int main() {
+  int r=0; int t=0;
+  for (t=0; t<10; t=t+1) r=r+sum(%(iterations)d)+count(%(iterations)d);
+  return r-r;
+}
+"""
+
+
+@click.command()
+@click.option("--iterations", default=2000000, help="loop trip count per call")
+@click.option("--repeat", default=3)
+def main(iterations: int, repeat: int):
+    source = LOOP_PROGRAM % {"iterations": iterations}
+    with tempfile.TemporaryDirectory() as directory:
+        baseline = build_executable(source, directory, "baseline")
+        optimized = build_executable(source, directory, "optimized", "-O")
+        before = best_of(repeat, lambda: run_executable(baseline))
+        after = best_of(repeat, lambda: run_executable(optimized))
+    click.echo(f"loops: {before:.3f}s without -O, {after:.3f}s with -O")
+    click.echo(f"  {before / after:.2f}x speedup")
+
+
+if __name__ == "__main__":
+    main()
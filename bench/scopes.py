@@ -0,0 +1,31 @@
+import click
+
+from bench.common import best_of
+from nadeshiko.parse import Parse
+from nadeshiko.tokenize import tokenize
+
+
+def generate_locals(count: int) -> str:
+    results = ["int main() {\n"]
+    for index in range(count):
+        results.append(f"  int v{index};\n")
+    for index in range(count):
+        results.append(f"  v{index} = v{count - index - 1} + {index};\n")
+    results.append("  return v0;\n}\n")
+    return "".join(results)
+
+
+@click.command()
+@click.option("--locals", "count", default=10000, help="number of local variables")
+@click.option("--repeat", default=3)
+def main(count: int, repeat: int):
+    source = generate_locals(count)
+    elapsed = best_of(repeat, lambda: Parse(tokenize(source)).parse_stmt())
+    click.echo(
+        f"scopes: {count} locals, {2 * count} references, {elapsed:.3f}s, "
+        f"{elapsed / count * 1e6:.1f}us per local"
+    )
+
+
+if __name__ == "__main__":
+    main()
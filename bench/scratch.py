@@ -0,0 +1,40 @@
+import glob
+import subprocess
+import sys
+
+import click
+
+
+def count_frame_accesses(path: str, *flags: str) -> tuple[int, int]:
+    source = subprocess.run(
+        ["cc", "-E", "-P", "-C", path], check=True, capture_output=True, text=True
+    ).stdout
+    assembly = subprocess.run(
+        [sys.executable, "main.py", *flags, "-"],
+        input=source,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    instructions = [
+        line
+        for line in assembly.splitlines()
+        if line.startswith("  ") and not line.startswith("  .")
+    ]
+    return sum("(%rbp)" in line for line in instructions), len(instructions)
+
+
+@click.command()
+@click.argument("paths", nargs=-1)
+def main(paths: tuple[str, ...]):
+    for path in paths or sorted(glob.glob("test/*.c")):
+        before, before_total = count_frame_accesses(path)
+        after, after_total = count_frame_accesses(path, "-O")
+        click.echo(
+            f"{path}: frame accesses {before} -> {after}, "
+            f"instructions {before_total} -> {after_total}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import tempfile
+
+import click
+
+from bench.common import best_of, build_executable, run_executable
+
+ARRAY_PROGRAM = """\
+int values[1000];
+
+int fill(int n) {
+  int i=0;
+  for (i=0; i<n; i=i+1) values[i - i/1000*1000] = i*10/3;
+  return 0;
+}
+
+int walk(int n) {
+  int i=0; int total=0; int *p=values;
+  for (i=0; i<n; i=i+1) total = total + *(p + (i - i/1000*1000)) / 7;
+  return total;
+}
+
+int main() {
+  fill(%(iterations)d);
+  walk(%(iterations)d);
+  return 0;
+}
+"""
+
+
+@click.command()
+@click.option("--iterations", default=2000000, help="loop trip count per call")
+@click.option("--repeat", default=5)
+def main(iterations: int, repeat: int):
+    source = ARRAY_PROGRAM % {"iterations": iterations}
+    with tempfile.TemporaryDirectory() as directory:
+        baseline = build_executable(
+            source, directory, "baseline", "-O", "--no-strength-reduction"
+        )
+        reduced = build_executable(source, directory, "reduced", "-O")
+        before = best_of(repeat, lambda: run_executable(baseline))
+        after = best_of(repeat, lambda: run_executable(reduced))
+    click.echo(f"arrays: {before:.3f}s with imul/idiv, {after:.3f}s strength-reduced")
+    click.echo(f"  {before / after:.2f}x speedup")
+
+
+if __name__ == "__main__":
+    main()
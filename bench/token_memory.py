@@ -0,0 +1,36 @@
+import tracemalloc
+
+import click
+
+from bench.common import generate_program
+from nadeshiko.tokenize import tokenize
+
+
+@click.command()
+@click.option("--functions", default=2000, help="number of generated functions")
+def main(functions: int):
+    source = generate_program(functions)
+
+    tracemalloc.start()
+    for _ in tokenize(source):
+        pass
+    streamed = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    tokens = list(tokenize(source))
+    with_views = tracemalloc.get_traced_memory()[0] - len(tokens) * 8
+    stores = list({id(token.store): token.store for token in tokens}.values())
+    count = len(tokens)
+    del tokens
+    store_only = tracemalloc.get_traced_memory()[0] - len(stores) * 8
+    tracemalloc.stop()
+
+    click.echo(f"token memory: {count} tokens in {len(stores)} chunks")
+    click.echo(f"  column store only: {store_only / count:.1f} bytes per token")
+    click.echo(f"  store plus live views: {with_views / count:.1f} bytes per token")
+    click.echo(f"  streamed without keeping views: {streamed / 1024:.1f} KiB peak")
+
+
+if __name__ == "__main__":
+    main()
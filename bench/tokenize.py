@@ -0,0 +1,22 @@
+import click
+
+from bench.common import generate_program, best_of
+from nadeshiko.tokenize import tokenize
+
+
+@click.command()
+@click.option("--functions", default=2000, help="number of generated functions")
+@click.option("--repeat", default=3)
+def main(functions: int, repeat: int):
+    source = generate_program(functions)
+    size = len(source.encode())
+    elapsed = best_of(repeat, lambda: list(tokenize(source)))
+    tokens = len(list(tokenize(source)))
+    click.echo(
+        f"tokenize: {size / 1e6:.2f} MB, {tokens} tokens, "
+        f"{elapsed:.3f}s, {size / 1e6 / elapsed:.2f} MB/s"
+    )
+
+
+if __name__ == "__main__":
+    main()
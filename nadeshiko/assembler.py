@@ -0,0 +1,433 @@
+import re
+import struct
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Optional
+
+from nadeshiko.elf import (
+    ObjectFile,
+    Relocation,
+    Section,
+    Symbol,
+    R_X86_64_PC32,
+    R_X86_64_PLT32,
+    SHF_ALLOC,
+    SHF_EXECINSTR,
+    SHF_MERGE,
+    SHF_STRINGS,
+    SHF_WRITE,
+    SHT_NOBITS,
+    SHT_PROGBITS,
+)
+
+REGISTERS_64 = {
+    name: code
+    for code, name in enumerate(
+        "rax rcx rdx rbx rsp rbp rsi rdi r8 r9 r10 r11 r12 r13 r14 r15".split()
+    )
+}
+REGISTERS_8 = {
+    name: code
+    for code, name in enumerate(
+        "al cl dl bl spl bpl sil dil r8b r9b r10b r11b r12b r13b r14b r15b".split()
+    )
+}
+RIP = -1
+SCALES = {1: 0, 2: 1, 4: 2, 8: 3}
+
+SECTION_DIRECTIVES = {
+    ".text": (".text", SHT_PROGBITS, SHF_ALLOC | SHF_EXECINSTR),
+    ".data": (".data", SHT_PROGBITS, SHF_ALLOC | SHF_WRITE),
+    ".bss": (".bss", SHT_NOBITS, SHF_ALLOC | SHF_WRITE),
+}
+SECTION_FLAGS = {
+    "a": SHF_ALLOC,
+    "w": SHF_WRITE,
+    "x": SHF_EXECINSTR,
+    "M": SHF_MERGE,
+    "S": SHF_STRINGS,
+}
+
+ARITHMETIC_OPCODES = {
+    "add": (0x01, 0x03, 0),
+    "or": (0x09, 0x0B, 1),
+    "and": (0x21, 0x23, 4),
+    "sub": (0x29, 0x2B, 5),
+    "xor": (0x31, 0x33, 6),
+    "cmp": (0x39, 0x3B, 7),
+}
+UNARY_OPCODES = {"not": 2, "neg": 3, "mul": 4, "imul": 5, "div": 6, "idiv": 7}
+SHIFT_OPCODES = {"shl": 4, "shr": 5, "sar": 7}
+CONDITION_CODES = {
+    "e": 0x4,
+    "ne": 0x5,
+    "l": 0xC,
+    "ge": 0xD,
+    "le": 0xE,
+    "g": 0xF,
+}
+
+MEMORY_OPERAND = re.compile(
+    r"(?P<displacement>[^(]*)\((?P<base>%\w+)?(?:,(?P<index>%\w+)(?:,(?P<scale>\d))?)?\)"
+)
+STRING_ESCAPE = re.compile(r"\\([0-7]{1,3}|.)")
+
+
+Reference = tuple[int, str, int, int]
+Encoding = tuple[bytes, Optional[Reference]]
+
+
+class OperandKind(IntEnum):
+    Register = 1
+    Immediate = 2
+    Memory = 3
+    Symbol = 4
+
+
+@dataclass(slots=True)
+class Operand:
+    kind: OperandKind
+    register: int = 0
+    size: int = 8
+    value: int = 0
+    base: Optional[int] = None
+    index: Optional[int] = None
+    scale: int = 1
+    symbol: Optional[str] = None
+
+
+def register_code(name: str) -> int:
+    if name == "%rip":
+        return RIP
+    return REGISTERS_64[name[1:]]
+
+
+def parse_operand(text: str) -> Operand:
+    if text.startswith("$"):
+        return Operand(OperandKind.Immediate, value=int(text[1:], 0))
+    if text.startswith("%"):
+        name = text[1:]
+        if name in REGISTERS_64:
+            return Operand(OperandKind.Register, register=REGISTERS_64[name])
+        return Operand(OperandKind.Register, register=REGISTERS_8[name], size=1)
+    if match := MEMORY_OPERAND.fullmatch(text):
+        operand = Operand(OperandKind.Memory)
+        displacement = match.group("displacement")
+        operand.base = register_code(match.group("base"))
+        if operand.base == RIP:
+            operand.symbol = displacement
+        elif displacement:
+            operand.value = int(displacement, 0)
+        if match.group("index"):
+            operand.index = register_code(match.group("index"))
+            operand.scale = int(match.group("scale") or 1)
+        return operand
+    return Operand(OperandKind.Symbol, symbol=text)
+
+
+def split_operands(text: str) -> list[str]:
+    results = []
+    depth = 0
+    start = 0
+    for i, char in enumerate(text):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            results.append(text[start:i].strip())
+            start = i + 1
+    if text.strip():
+        results.append(text[start:].strip())
+    return results
+
+
+def parse_string(text: str) -> bytes:
+    def unescape(match: re.Match) -> str:
+        escape = match.group(1)
+        if escape[0] in "01234567":
+            return chr(int(escape, 8))
+        return {"n": "\n", "t": "\t"}.get(escape, escape)
+
+    value = STRING_ESCAPE.sub(unescape, text[1:-1])
+    try:
+        return value.encode("latin-1")
+    except UnicodeEncodeError:
+        return bytes(ord(char) & 0xFF for char in value)
+
+
+def is_byte_register(operand: Operand) -> bool:
+    return operand.kind == OperandKind.Register and operand.size == 1
+
+
+def needs_rex(operand: Operand) -> bool:
+    return is_byte_register(operand) and 4 <= operand.register < 8
+
+
+def immediate_form(short: int, long: int, value: int) -> tuple[bytes, bytes]:
+    if -128 <= value < 128:
+        return bytes([short]), struct.pack("<b", value)
+    return bytes([long]), struct.pack("<i", value)
+
+
+def encode_modrm(
+    opcode: bytes,
+    reg: int,
+    rm: Operand,
+    wide: bool = True,
+    force_rex: bool = False,
+    immediate: bytes = b"",
+) -> Encoding:
+    rex = 0x8 if wide else 0
+    if reg & 8:
+        rex |= 0x4
+    reference = None
+    if rm.kind == OperandKind.Register:
+        if rm.register & 8:
+            rex |= 0x1
+        tail = bytes([0xC0 | (reg & 7) << 3 | rm.register & 7])
+    elif rm.base == RIP:
+        tail = bytes([(reg & 7) << 3 | 5]) + bytes(4)
+    else:
+        base, index = rm.base, rm.index
+        if base & 8:
+            rex |= 0x1
+        if index is not None and index & 8:
+            rex |= 0x2
+        if rm.value == 0 and base & 7 != 5:
+            mode, displacement = 0, b""
+        elif -128 <= rm.value < 128:
+            mode, displacement = 1, struct.pack("<b", rm.value)
+        else:
+            mode, displacement = 2, struct.pack("<i", rm.value)
+        if index is not None or base & 7 == 4:
+            index = 4 if index is None else index
+            sib = SCALES[rm.scale] << 6 | (index & 7) << 3 | base & 7
+            tail = bytes([mode << 6 | (reg & 7) << 3 | 4, sib]) + displacement
+        else:
+            tail = bytes([mode << 6 | (reg & 7) << 3 | base & 7]) + displacement
+    prefix = bytes([0x40 | rex]) if rex or force_rex else b""
+    data = prefix + opcode + tail + immediate
+    if rm.kind == OperandKind.Memory and rm.base == RIP:
+        offset = len(data) - len(immediate) - 4
+        reference = (offset, rm.symbol, R_X86_64_PC32, -4 - len(immediate))
+    return data, reference
+
+
+def encode_branch(opcode: bytes, target: Operand, kind: int) -> Encoding:
+    if target.kind != OperandKind.Symbol:
+        raise ValueError("unsupported branch target")
+    return opcode + bytes(4), (len(opcode), target.symbol, kind, -4)
+
+
+def encode_mov(source: Operand, destination: Operand) -> Encoding:
+    if source.kind == OperandKind.Immediate:
+        if -(1 << 31) <= source.value < 1 << 31:
+            immediate = struct.pack("<i", source.value)
+            return encode_modrm(b"\xc7", 0, destination, immediate=immediate)
+        register = destination.register
+        prefix = bytes([0x48 | (register >> 3), 0xB8 | register & 7])
+        return prefix + struct.pack("<q", source.value), None
+    if is_byte_register(source):
+        return encode_modrm(
+            b"\x88",
+            source.register,
+            destination,
+            wide=False,
+            force_rex=needs_rex(source),
+        )
+    if source.kind == OperandKind.Register:
+        return encode_modrm(b"\x89", source.register, destination)
+    return encode_modrm(b"\x8b", destination.register, source)
+
+
+def encode_instruction(mnemonic: str, operands: list[Operand]) -> Encoding:
+    match mnemonic, operands:
+        case "ret", []:
+            return b"\xc3", None
+        case "cqo", []:
+            return b"\x48\x99", None
+        case ("push" | "pop"), [Operand(kind=OperandKind.Register) as operand]:
+            base = 0x50 if mnemonic == "push" else 0x58
+            prefix = b"\x41" if operand.register & 8 else b""
+            return prefix + bytes([base | operand.register & 7]), None
+        case "call", [target]:
+            return encode_branch(b"\xe8", target, R_X86_64_PLT32)
+        case "jmp", [target]:
+            return encode_branch(b"\xe9", target, R_X86_64_PC32)
+        case _, [target] if mnemonic[0] == "j" and mnemonic[1:] in CONDITION_CODES:
+            opcode = bytes([0x0F, 0x80 | CONDITION_CODES[mnemonic[1:]]])
+            return encode_branch(opcode, target, R_X86_64_PC32)
+        case _, [operand] if mnemonic.startswith("set"):
+            opcode = bytes([0x0F, 0x90 | CONDITION_CODES[mnemonic[3:]]])
+            return encode_modrm(
+                opcode, 0, operand, wide=False, force_rex=needs_rex(operand)
+            )
+        case "mov", [source, destination]:
+            return encode_mov(source, destination)
+        case "lea", [source, destination]:
+            return encode_modrm(b"\x8d", destination.register, source)
+        case ("movsbq" | "movzb" | "movzbq"), [source, destination]:
+            opcode = b"\x0f\xbe" if mnemonic == "movsbq" else b"\x0f\xb6"
+            return encode_modrm(opcode, destination.register, source)
+        case "xchg", [source, destination]:
+            return encode_modrm(b"\x87", source.register, destination)
+        case "imul", [source, destination]:
+            if source.kind == OperandKind.Immediate:
+                opcode, immediate = immediate_form(0x6B, 0x69, source.value)
+                return encode_modrm(
+                    opcode, destination.register, destination, immediate=immediate
+                )
+            return encode_modrm(b"\x0f\xaf", destination.register, source)
+        case _, [operand] if mnemonic in UNARY_OPCODES:
+            return encode_modrm(b"\xf7", UNARY_OPCODES[mnemonic], operand)
+        case _, [count, operand] if mnemonic in SHIFT_OPCODES:
+            if count.value == 1:
+                return encode_modrm(b"\xd1", SHIFT_OPCODES[mnemonic], operand)
+            return encode_modrm(
+                b"\xc1",
+                SHIFT_OPCODES[mnemonic],
+                operand,
+                immediate=struct.pack("<B", count.value),
+            )
+        case _, [source, destination] if mnemonic in ARITHMETIC_OPCODES:
+            to_rm, from_rm, extension = ARITHMETIC_OPCODES[mnemonic]
+            if source.kind == OperandKind.Immediate:
+                opcode, immediate = immediate_form(0x83, 0x81, source.value)
+                return encode_modrm(opcode, extension, destination, immediate=immediate)
+            if source.kind == OperandKind.Register:
+                return encode_modrm(bytes([to_rm]), source.register, destination)
+            return encode_modrm(bytes([from_rm]), destination.register, source)
+    raise ValueError(f"unsupported instruction {mnemonic}")
+
+
+def encode_line(line: str) -> Encoding:
+    mnemonic, _, rest = line.strip().partition(" ")
+    return encode_instruction(
+        mnemonic, [parse_operand(item) for item in split_operands(rest)]
+    )
+
+
+class Assembler:
+    def __init__(self) -> None:
+        self.sections: dict[str, Section] = {}
+        self.symbols: dict[str, Symbol] = {}
+        self.globals: set[str] = set()
+        self.fixups: list[tuple[Section, int, str, int, int]] = []
+        self.encodings: dict[str, Encoding] = {}
+        self.section = self.switch_section(*SECTION_DIRECTIVES[".text"])
+
+    def switch_section(
+        self, name: str, kind: int, flags: int, entry_size: int = 0
+    ) -> Section:
+        if (section := self.sections.get(name)) is None:
+            section = self.sections[name] = Section(
+                name, kind, flags, entry_size=entry_size
+            )
+        self.section = section
+        return section
+
+    @property
+    def offset(self) -> int:
+        return self.section.length
+
+    def emit_bytes(self, data: bytes) -> None:
+        if self.section.kind == SHT_NOBITS:
+            self.section.size += len(data)
+        else:
+            self.section.data += data
+
+    def assemble(self, text: str) -> ObjectFile:
+        for line in text.splitlines():
+            self.assemble_line(line)
+        for section, offset, name, kind, addend in self.fixups:
+            symbol = self.symbols.get(name)
+            if (
+                kind == R_X86_64_PC32
+                and symbol is not None
+                and symbol.section == section.name
+            ):
+                value = symbol.offset + addend - offset
+                section.data[offset : offset + 4] = struct.pack("<i", value)
+            else:
+                self.symbols.setdefault(name, Symbol(name))
+                section.relocations.append(Relocation(offset, name, kind, addend))
+        for name in self.globals:
+            self.symbols.setdefault(name, Symbol(name)).is_global = True
+        return ObjectFile(list(self.sections.values()), self.symbols)
+
+    def assemble_line(self, line: str) -> None:
+        if (encoding := self.encodings.get(line)) is not None:
+            self.emit_instruction(encoding)
+            return
+        if not line or line.startswith("  .loc"):
+            return
+        if line.endswith(":"):
+            name = line.strip()[:-1]
+            if name in self.symbols and self.symbols[name].section is not None:
+                raise ValueError(f"symbol {name} is already defined")
+            symbol = self.symbols.setdefault(name, Symbol(name))
+            symbol.section, symbol.offset = self.section.name, self.offset
+            return
+        if line.lstrip().startswith("."):
+            mnemonic, _, rest = line.strip().partition(" ")
+            self.directive(mnemonic, rest.strip())
+            return
+        encoding = self.encodings[line] = encode_line(line)
+        self.emit_instruction(encoding)
+
+    def emit_instruction(self, encoding: Encoding) -> None:
+        data, reference = encoding
+        section = self.section
+        if reference is not None:
+            offset, name, kind, addend = reference
+            offset += len(section.data)
+            self.fixups.append((section, offset, name, kind, addend))
+        section.data += data
+
+    def directive(self, name: str, argument: str) -> None:
+        match name:
+            case ".file" | ".loc":
+                return
+            case ".global" | ".globl":
+                self.globals.add(argument)
+            case ".text" | ".data" | ".bss":
+                self.switch_section(*SECTION_DIRECTIVES[name])
+            case ".section":
+                self.section_directive(argument)
+            case ".align":
+                align = int(argument)
+                self.section.align = max(self.section.align, align)
+                self.emit_bytes(bytes(-self.offset % align))
+            case ".zero":
+                self.emit_bytes(bytes(int(argument)))
+            case ".byte":
+                self.emit_bytes(bytes(int(item) & 0xFF for item in argument.split(",")))
+            case ".string":
+                self.emit_bytes(parse_string(argument) + b"\0")
+            case ".ascii":
+                self.emit_bytes(parse_string(argument))
+            case _:
+                raise ValueError(f"unsupported directive {name}")
+
+    def section_directive(self, argument: str) -> None:
+        name, *options = [item.strip() for item in argument.split(",")]
+        if name in SECTION_DIRECTIVES:
+            self.switch_section(*SECTION_DIRECTIVES[name])
+            return
+        if not options:
+            kind = SHT_NOBITS if name.startswith(".bss") else SHT_PROGBITS
+            self.switch_section(name, kind, SHF_ALLOC)
+            return
+        flags = 0
+        for char in options[0].strip('"'):
+            flags |= SECTION_FLAGS[char]
+        kind = (
+            SHT_NOBITS if len(options) > 1 and options[1] == "@nobits" else SHT_PROGBITS
+        )
+        entry_size = int(options[2]) if len(options) > 2 else 0
+        self.switch_section(name, kind, flags, entry_size)
+
+
+def assemble(text: str) -> ObjectFile:
+    return Assembler().assemble(text)
@@ -1,4 +1,5 @@
 from contextvars import ContextVar
 
 CURRENT_VAR_ID = ContextVar("CURRENT_VAR_ID", default=0)
-UNIQUE_COUNT_ID = ContextVar("UNIQUE_COUNT_ID", default=1)
+SCRATCH_REGISTERS = ContextVar("SCRATCH_REGISTERS", default=())
+STRENGTH_REDUCTION = ContextVar("STRENGTH_REDUCTION", default=False)
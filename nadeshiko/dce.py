@@ -0,0 +1,151 @@
+from typing import Optional
+
+from nadeshiko.fold import prune_constant_condition, replace_node
+from nadeshiko.label import children, label_tree, operands, post_order
+from nadeshiko.node import Node, NodeKind, Obj, count_nodes, new_node
+
+
+def has_side_effects(node: Node) -> bool:
+    return label_tree(node)[id(node)].has_side_effects
+
+
+def is_empty(node: Node) -> bool:
+    return node.kind == NodeKind.Block and node.body is None
+
+
+def make_empty(node: Node) -> None:
+    replace_node(node, new_node(NodeKind.Block, node.token))
+
+
+def dead_locals(obj: Obj) -> set[int]:
+    reads: set[int] = set()
+    writes: set[int] = set()
+    stack = [obj.body]
+    while stack:
+        node = stack.pop()
+        match node.kind:
+            case NodeKind.Addr:
+                return set()
+            case NodeKind.Assign if node.left.kind == NodeKind.Variable:
+                if node.left.var.is_local:
+                    writes.add(id(node.left.var))
+                stack.append(node.right)
+                continue
+            case NodeKind.Variable:
+                reads.add(id(node.var))
+        stack.extend(children(node))
+    return writes - reads
+
+
+def referenced_locals(obj: Obj) -> Optional[set[int]]:
+    results: set[int] = set()
+    stack = [obj.body]
+    while stack:
+        node = stack.pop()
+        if node.kind == NodeKind.Addr:
+            return None
+        if node.kind == NodeKind.Variable:
+            results.add(id(node.var))
+        stack.extend(children(node))
+    return results
+
+
+def eliminate_node(node: Node, dead: set[int], results: dict[int, Node]) -> Node:
+    match node.kind:
+        case NodeKind.Assign if (
+            node.left.kind == NodeKind.Variable and id(node.left.var) in dead
+        ):
+            return results[id(node.right)]
+        case NodeKind.FunctionCall:
+            node.function_args = [results[id(arg)] for arg in node.function_args]
+            return node
+        case NodeKind.StmtExpression:
+            stmt = node.body
+            while stmt.next_node:
+                eliminate_stmt(stmt, dead)
+                stmt = stmt.next_node
+            stmt.left = eliminate_expr(stmt.left, dead)
+            return node
+    node.left = results.get(id(node.left))
+    node.right = results.get(id(node.right))
+    return node
+
+
+def eliminate_expr(node: Optional[Node], dead: set[int]) -> Optional[Node]:
+    if not node:
+        return node
+    results: dict[int, Node] = {}
+    for item in post_order(node, operands):
+        results[id(item)] = eliminate_node(item, dead, results)
+    return results[id(node)]
+
+
+def eliminate_block(node: Optional[Node], dead: set[int]) -> Optional[Node]:
+    head = tail = None
+    while node:
+        next_node = node.next_node
+        eliminate_stmt(node, dead)
+        if not is_empty(node):
+            if tail:
+                tail.next_node = node
+            else:
+                head = node
+            tail = node
+            if node.kind == NodeKind.Return:
+                break
+        node = next_node
+    if tail:
+        tail.next_node = None
+    return head
+
+
+def eliminate_stmt(node: Node, dead: set[int]) -> None:
+    match node.kind:
+        case NodeKind.If:
+            node.condition = eliminate_expr(node.condition, dead)
+            eliminate_stmt(node.then, dead)
+            if node.els:
+                eliminate_stmt(node.els, dead)
+            prune_constant_condition(node)
+        case NodeKind.ForStmt:
+            if node.init:
+                eliminate_stmt(node.init, dead)
+            node.condition = eliminate_expr(node.condition, dead)
+            if prune_constant_condition(node):
+                return
+            eliminate_stmt(node.then, dead)
+            node.inc = eliminate_expr(node.inc, dead)
+            if node.inc and not has_side_effects(node.inc):
+                node.inc = None
+        case NodeKind.ExpressionStmt:
+            node.left = eliminate_expr(node.left, dead)
+            if not has_side_effects(node.left):
+                make_empty(node)
+        case NodeKind.Return:
+            node.left = eliminate_expr(node.left, dead)
+        case NodeKind.Block:
+            node.body = eliminate_block(node.body, dead)
+
+
+def eliminate_function(obj: Obj) -> None:
+    while True:
+        before = count_nodes([obj])
+        eliminate_stmt(obj.body, dead_locals(obj))
+        if count_nodes([obj]) == before:
+            break
+    referenced = referenced_locals(obj)
+    if referenced is not None:
+        params = {id(param) for param in obj.params}
+        obj.locals_obj = [
+            var for var in obj.locals_obj if id(var) in referenced or id(var) in params
+        ]
+
+
+def eliminate_dead_code(prog: list[Obj]) -> dict[str, int]:
+    results = {}
+    for obj in prog:
+        if obj.is_function:
+            before = count_nodes([obj])
+            eliminate_function(obj)
+            results[obj.name] = before - count_nodes([obj])
+    return results
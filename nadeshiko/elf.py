@@ -0,0 +1,193 @@
+import struct
+from dataclasses import dataclass, field
+from typing import Optional
+
+SHT_PROGBITS = 1
+SHT_SYMTAB = 2
+SHT_STRTAB = 3
+SHT_RELA = 4
+SHT_NOBITS = 8
+
+SHF_WRITE = 0x1
+SHF_ALLOC = 0x2
+SHF_EXECINSTR = 0x4
+SHF_MERGE = 0x10
+SHF_STRINGS = 0x20
+SHF_INFO_LINK = 0x40
+
+STB_LOCAL = 0
+STB_GLOBAL = 1
+STT_NOTYPE = 0
+STT_OBJECT = 1
+STT_FUNC = 2
+
+R_X86_64_PC32 = 2
+R_X86_64_PLT32 = 4
+
+ET_REL = 1
+EM_X86_64 = 62
+
+ELF_HEADER = struct.Struct("<16sHHIQQQIHHHHHH")
+SECTION_HEADER = struct.Struct("<IIQQQQIIQQ")
+SYMBOL = struct.Struct("<IBBHQQ")
+RELOCATION = struct.Struct("<QQq")
+ELF_IDENT = b"\x7fELF\x02\x01\x01" + bytes(9)
+
+
+@dataclass(slots=True)
+class Relocation:
+    offset: int
+    symbol: str
+    kind: int
+    addend: int
+
+
+@dataclass(slots=True)
+class Section:
+    name: str
+    kind: int
+    flags: int
+    data: bytearray = field(default_factory=bytearray)
+    size: int = 0
+    align: int = 1
+    entry_size: int = 0
+    relocations: list[Relocation] = field(default_factory=list)
+
+    @property
+    def length(self) -> int:
+        return self.size if self.kind == SHT_NOBITS else len(self.data)
+
+
+@dataclass(slots=True)
+class Symbol:
+    name: str
+    section: Optional[str] = None
+    offset: int = 0
+    is_global: bool = False
+
+
+@dataclass(slots=True)
+class ObjectFile:
+    sections: list[Section]
+    symbols: dict[str, Symbol]
+
+
+class StringTable:
+    def __init__(self) -> None:
+        self.data = bytearray(b"\0")
+        self.offsets: dict[str, int] = {"": 0}
+
+    def add(self, name: str) -> int:
+        if (offset := self.offsets.get(name)) is None:
+            offset = self.offsets[name] = len(self.data)
+            self.data += name.encode() + b"\0"
+        return offset
+
+
+def symbol_table(
+    obj: ObjectFile, indexes: dict[str, int], names: StringTable
+) -> tuple[bytearray, dict[str, int], int]:
+    referenced = {
+        relocation.symbol
+        for section in obj.sections
+        for relocation in section.relocations
+    }
+    symbols = [
+        symbol
+        for symbol in obj.symbols.values()
+        if symbol.is_global or symbol.section is None or symbol.name in referenced
+    ]
+    symbols.sort(key=lambda symbol: symbol.is_global or symbol.section is None)
+    sections = {section.name: section for section in obj.sections}
+    data = bytearray(SYMBOL.size)
+    positions = {}
+    first_global = len(symbols) + 1
+    for position, symbol in enumerate(symbols, 1):
+        positions[symbol.name] = position
+        if symbol.section is None:
+            binding, kind, index = STB_GLOBAL, STT_NOTYPE, 0
+        else:
+            binding = STB_GLOBAL if symbol.is_global else STB_LOCAL
+            if sections[symbol.section].flags & SHF_EXECINSTR:
+                kind = STT_FUNC
+            else:
+                kind = STT_OBJECT
+            index = indexes[symbol.section]
+        if binding == STB_GLOBAL:
+            first_global = min(first_global, position)
+        data += SYMBOL.pack(
+            names.add(symbol.name), binding << 4 | kind, 0, index, symbol.offset, 0
+        )
+    return data, positions, first_global
+
+
+def write_object(obj: ObjectFile) -> bytes:
+    sections = obj.sections + [Section(".note.GNU-stack", SHT_PROGBITS, 0)]
+    indexes = {section.name: i for i, section in enumerate(sections, 1)}
+    relocated = [section for section in obj.sections if section.relocations]
+    symtab_index = len(sections) + len(relocated) + 1
+    names = StringTable()
+    symtab, positions, first_global = symbol_table(obj, indexes, names)
+    headers = [(section, 0, 0) for section in sections]
+    for section in relocated:
+        data = bytearray()
+        for relocation in section.relocations:
+            info = positions[relocation.symbol] << 32 | relocation.kind
+            data += RELOCATION.pack(relocation.offset, info, relocation.addend)
+        rela = Section(
+            f".rela{section.name}",
+            SHT_RELA,
+            SHF_INFO_LINK,
+            data,
+            align=8,
+            entry_size=RELOCATION.size,
+        )
+        headers.append((rela, symtab_index, indexes[section.name]))
+    symtab_section = Section(
+        ".symtab", SHT_SYMTAB, 0, symtab, align=8, entry_size=SYMBOL.size
+    )
+    headers.append((symtab_section, symtab_index + 1, first_global))
+    headers.append((Section(".strtab", SHT_STRTAB, 0, names.data), 0, 0))
+    section_names = StringTable()
+    for section, _, _ in headers:
+        section_names.add(section.name)
+    section_names.add(".shstrtab")
+    headers.append((Section(".shstrtab", SHT_STRTAB, 0, section_names.data), 0, 0))
+    body = bytearray(ELF_HEADER.size)
+    table = bytearray(SECTION_HEADER.size)
+    for section, link, info in headers:
+        if section.kind != SHT_NOBITS:
+            body += bytes(-len(body) % section.align)
+        offset = len(body)
+        if section.kind != SHT_NOBITS:
+            body += section.data
+        table += SECTION_HEADER.pack(
+            section_names.add(section.name),
+            section.kind,
+            section.flags,
+            0,
+            offset,
+            section.length,
+            link,
+            info,
+            section.align,
+            section.entry_size,
+        )
+    body += bytes(-len(body) % 8)
+    body[: ELF_HEADER.size] = ELF_HEADER.pack(
+        ELF_IDENT,
+        ET_REL,
+        EM_X86_64,
+        1,
+        0,
+        0,
+        len(body),
+        0,
+        ELF_HEADER.size,
+        0,
+        0,
+        SECTION_HEADER.size,
+        len(headers) + 1,
+        len(headers),
+    )
+    return bytes(body + table)
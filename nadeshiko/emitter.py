@@ -0,0 +1,72 @@
+from typing import Optional, TextIO
+
+from nadeshiko.helper import line_index
+from nadeshiko.token import Token
+
+DEFAULT_FLUSH_SIZE = 1 << 16
+DEFAULT_DEBUG_LEVEL = 1
+
+
+def is_instruction(line: str) -> bool:
+    return line.startswith("  ") and not line.startswith("  .")
+
+
+class Emitter:
+    def __init__(
+        self,
+        output: TextIO,
+        flush_size: int = DEFAULT_FLUSH_SIZE,
+        debug_level: int = DEFAULT_DEBUG_LEVEL,
+    ) -> None:
+        self.output = output
+        self.flush_size = flush_size
+        self.debug_level = debug_level
+        self.token: Optional[Token] = None
+        self.location: Optional[tuple[int, int]] = None
+        self.buffer: list[str] = []
+        self.buffered = 0
+
+    def emit(self, line: str) -> None:
+        if self.token is not None and is_instruction(line):
+            self.emit_location()
+        self.put(line)
+
+    def put(self, line: str) -> None:
+        self.buffer.append(line)
+        self.buffer.append("\n")
+        self.buffered += len(line) + 1
+        if self.buffered >= self.flush_size:
+            self.write()
+
+    def file(self, filename: str) -> None:
+        if self.debug_level > 0:
+            self.put(f'.file 1 "{filename}"')
+
+    def loc(self, token: Token) -> None:
+        if self.debug_level > 0:
+            self.token = token
+
+    def emit_location(self) -> None:
+        token = self.token
+        self.token = None
+        if self.debug_level == 1:
+            location = (token.line_number, 0)
+        else:
+            column = line_index(token.original_expression).column(token.location)
+            location = (token.line_number, column + 1)
+        if location == self.location:
+            return
+        self.location = location
+        if self.debug_level == 1:
+            self.put(f"  .loc 1 {location[0]}")
+        else:
+            self.put(f"  .loc 1 {location[0]} {location[1]}")
+
+    def write(self) -> None:
+        self.output.write("".join(self.buffer))
+        self.output.flush()
+        self.buffer.clear()
+        self.buffered = 0
+
+    def flush(self) -> None:
+        self.write()
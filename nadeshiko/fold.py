@@ -0,0 +1,130 @@
+from dataclasses import fields
+from typing import Callable, Optional
+
+from nadeshiko.helper import wrap_int64
+from nadeshiko.label import operands, post_order
+from nadeshiko.node import Node, NodeKind, Obj, count_nodes, new_node, new_number
+
+INT64_MIN = -(1 << 63)
+
+
+def divide(left: int, right: int) -> Optional[int]:
+    if right == 0 or (left == INT64_MIN and right == -1):
+        return None
+    quotient = abs(left) // abs(right)
+    return quotient if (left < 0) == (right < 0) else -quotient
+
+
+BINARY_FOLDERS: dict[NodeKind, Callable[[int, int], Optional[int]]] = {
+    NodeKind.Add: lambda left, right: left + right,
+    NodeKind.Sub: lambda left, right: left - right,
+    NodeKind.Mul: lambda left, right: left * right,
+    NodeKind.Div: divide,
+    NodeKind.Equal: lambda left, right: int(left == right),
+    NodeKind.NotEqual: lambda left, right: int(left != right),
+    NodeKind.Less: lambda left, right: int(left < right),
+    NodeKind.LessEqual: lambda left, right: int(left <= right),
+}
+
+
+def constant(node: Node, value: int) -> Node:
+    result = new_number(wrap_int64(value), node.token)
+    result.node_type = node.node_type
+    return result
+
+
+def replace_node(node: Node, replacement: Node) -> None:
+    next_node = node.next_node
+    for field in fields(Node):
+        setattr(node, field.name, getattr(replacement, field.name))
+    node.next_node = next_node
+
+
+def fold_node(node: Node, folded: dict[int, Node]) -> Node:
+    match node.kind:
+        case NodeKind.Number | NodeKind.Variable:
+            return node
+        case NodeKind.FunctionCall:
+            node.function_args = [folded[id(arg)] for arg in node.function_args]
+            return node
+        case NodeKind.StmtExpression:
+            fold_block(node.body)
+            return node
+    node.left = folded.get(id(node.left))
+    node.right = folded.get(id(node.right))
+    left, right = node.left, node.right
+    match node.kind:
+        case NodeKind.Neg if left.kind == NodeKind.Number:
+            return constant(node, -left.value)
+        case NodeKind.Comma if left.kind == NodeKind.Number:
+            return right
+    folder = BINARY_FOLDERS.get(node.kind)
+    if folder is None or left.kind != NodeKind.Number or right.kind != NodeKind.Number:
+        return node
+    value = folder(left.value, right.value)
+    if value is None:
+        return node
+    return constant(node, value)
+
+
+def fold_expr(node: Optional[Node]) -> Optional[Node]:
+    if not node:
+        return node
+    folded: dict[int, Node] = {}
+    for item in post_order(node, operands):
+        folded[id(item)] = fold_node(item, folded)
+    return folded[id(node)]
+
+
+def fold_block(node: Optional[Node]) -> None:
+    while node:
+        fold_stmt(node)
+        node = node.next_node
+
+
+def prune_constant_condition(node: Node) -> bool:
+    condition = node.condition
+    if not condition or condition.kind != NodeKind.Number:
+        return False
+    match node.kind:
+        case NodeKind.If:
+            replacement = node.then if condition.value else node.els
+        case NodeKind.ForStmt if condition.value:
+            node.condition = None
+            return False
+        case NodeKind.ForStmt:
+            replacement = node.init
+        case _:
+            return False
+    replace_node(node, replacement or new_node(NodeKind.Block, node.token))
+    return True
+
+
+def fold_stmt(node: Node) -> None:
+    match node.kind:
+        case NodeKind.If:
+            node.condition = fold_expr(node.condition)
+            fold_stmt(node.then)
+            if node.els:
+                fold_stmt(node.els)
+            prune_constant_condition(node)
+        case NodeKind.ForStmt:
+            if node.init:
+                fold_stmt(node.init)
+            node.condition = fold_expr(node.condition)
+            if prune_constant_condition(node):
+                return
+            fold_stmt(node.then)
+            node.inc = fold_expr(node.inc)
+        case NodeKind.ExpressionStmt | NodeKind.Return:
+            node.left = fold_expr(node.left)
+        case NodeKind.Block:
+            fold_block(node.body)
+
+
+def fold_constants(prog: list[Obj]) -> int:
+    before = count_nodes(prog)
+    for obj in prog:
+        if obj.is_function:
+            fold_stmt(obj.body)
+    return before - count_nodes(prog)
@@ -1,3 +1,47 @@
+import re
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+
+NEWLINE_PATTERN = re.compile("\n")
+
+INT64_BIAS = 1 << 63
+UINT64_RANGE = 1 << 64
+
+
+class LineIndex:
+    def __init__(self, expression: str) -> None:
+        self.expression = expression
+        self.line_starts = array("q", [0])
+        self.line_starts.extend(
+            match.end() for match in NEWLINE_PATTERN.finditer(expression)
+        )
+
+    def line_number(self, location: int) -> int:
+        return bisect_right(self.line_starts, location)
+
+    def column(self, location: int) -> int:
+        return location - self.line_starts[self.line_number(location) - 1]
+
+    def line(self, line_number: int) -> str:
+        start = self.line_starts[line_number - 1]
+        if line_number < len(self.line_starts):
+            return self.expression[start : self.line_starts[line_number] - 1]
+        return self.expression[start:]
+
+
+@lru_cache(maxsize=8)
+def line_index(expression: str) -> LineIndex:
+    return LineIndex(expression)
+
+
 def error_message(expression: str, location: int, message: str) -> str:
-    messages = [f"{expression}\n", f"{' ' * location}^ {message}\n"]
+    index = line_index(expression)
+    line_number = index.line_number(location)
+    column = index.column(location)
+    messages = [f"{index.line(line_number)}\n", f"{' ' * column}^ {message}\n"]
     return "".join(messages)
+
+
+def wrap_int64(value: int) -> int:
+    return (value + INT64_BIAS) % UINT64_RANGE - INT64_BIAS
@@ -0,0 +1,131 @@
+import copy
+from dataclasses import dataclass
+from typing import Optional
+
+from nadeshiko.fold import replace_node
+from nadeshiko.label import children, post_order
+from nadeshiko.node import Node, NodeKind, Obj, count_nodes, new_node, new_var_node
+
+DEFAULT_INLINE_BUDGET = 32
+
+
+@dataclass(slots=True)
+class InlinedCall:
+    callee: str
+    caller: str
+    line_number: int
+
+
+def contains(node: Node, kind: NodeKind) -> bool:
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node.kind == kind:
+            return True
+        stack.extend(children(node))
+    return False
+
+
+def inline_body(obj: Obj) -> Optional[list[Node]]:
+    stmts = []
+    stmt = obj.body.body
+    while stmt and stmt.kind != NodeKind.Return:
+        stmts.append(stmt)
+        stmt = stmt.next_node
+    if stmt is None:
+        return None
+    if any(contains(item, NodeKind.Return) for item in stmts):
+        return None
+    return stmts + [stmt]
+
+
+def is_inlinable(obj: Obj, budget: int) -> bool:
+    if not obj.is_function or obj.body is None:
+        return False
+    if count_nodes([obj]) > budget or contains(obj.body, NodeKind.FunctionCall):
+        return False
+    return inline_body(obj) is not None
+
+
+def copy_node(node: Node, variables: dict[int, Obj], copies: dict[int, Node]) -> Node:
+    result = copy.copy(node)
+    if node.kind == NodeKind.Variable and id(node.var) in variables:
+        result.var = variables[id(node.var)]
+    for name in ("left", "right", "condition", "then", "els", "init", "inc", "body"):
+        setattr(result, name, copies.get(id(getattr(node, name))))
+    stmt = node.body
+    while stmt and stmt.next_node:
+        copies[id(stmt)].next_node = copies[id(stmt.next_node)]
+        stmt = stmt.next_node
+    if node.function_args is not None:
+        result.function_args = [copies[id(arg)] for arg in node.function_args]
+    result.next_node = None
+    return result
+
+
+def copy_tree(node: Optional[Node], variables: dict[int, Obj]) -> Optional[Node]:
+    if node is None:
+        return None
+    copies: dict[int, Node] = {}
+    for item in post_order(node):
+        copies[id(item)] = copy_node(item, variables, copies)
+    return copies[id(node)]
+
+
+def expression_stmt(expr: Node) -> Node:
+    node = new_node(NodeKind.ExpressionStmt, expr.token)
+    node.left = expr
+    return node
+
+
+def expand_call(caller: Obj, callee: Obj, call: Node) -> Node:
+    variables = {}
+    for var in callee.locals_obj:
+        local = Obj(var.name, 0, var.object_type, is_local=True)
+        caller.locals_obj.append(local)
+        variables[id(var)] = local
+    stmts = []
+    for param, arg in zip(callee.params, call.function_args):
+        target = new_var_node(variables[id(param)], call.token)
+        target.node_type = param.object_type
+        assign = new_node(NodeKind.Assign, call.token)
+        assign.left = target
+        assign.right = arg
+        assign.node_type = param.object_type
+        stmts.append(expression_stmt(assign))
+    *body, result = inline_body(callee)
+    stmts.extend(copy_tree(stmt, variables) for stmt in body)
+    stmts.append(expression_stmt(copy_tree(result.left, variables)))
+    for stmt, next_node in zip(stmts, stmts[1:]):
+        stmt.next_node = next_node
+    node = new_node(NodeKind.StmtExpression, call.token)
+    node.body = stmts[0]
+    node.node_type = call.node_type
+    return node
+
+
+def inline_calls(
+    caller: Obj, node: Node, candidates: dict[str, Obj], inlined: list[InlinedCall]
+) -> None:
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        stack.extend(reversed(children(node)))
+        if node.kind != NodeKind.FunctionCall:
+            continue
+        callee = candidates.get(node.function_name)
+        if callee is None or len(node.function_args) != len(callee.params):
+            continue
+        replace_node(node, expand_call(caller, callee, node))
+        inlined.append(InlinedCall(callee.name, caller.name, node.token.line_number))
+
+
+def inline_functions(
+    prog: list[Obj], budget: int = DEFAULT_INLINE_BUDGET
+) -> list[InlinedCall]:
+    candidates = {obj.name: obj for obj in prog if is_inlinable(obj, budget)}
+    inlined: list[InlinedCall] = []
+    for obj in prog:
+        if obj.is_function:
+            inline_calls(obj, obj.body, candidates, inlined)
+    return inlined
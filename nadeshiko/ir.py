@@ -0,0 +1,421 @@
+import re
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Optional
+
+from nadeshiko.node import Node, NodeKind, Obj
+from nadeshiko.token import Token
+from nadeshiko.type import TypeKind
+
+
+class Opcode(IntEnum):
+    Const = 1
+    LocalAddress = 2
+    GlobalAddress = 3
+    Load = 4
+    Store = 5
+    Add = 6
+    Sub = 7
+    Mul = 8
+    Div = 9
+    Neg = 10
+    Equal = 11
+    NotEqual = 12
+    Less = 13
+    LessEqual = 14
+    Call = 15
+    Jump = 16
+    Branch = 17
+    Return = 18
+
+
+BINARY_OPCODES = {
+    NodeKind.Add: Opcode.Add,
+    NodeKind.Sub: Opcode.Sub,
+    NodeKind.Mul: Opcode.Mul,
+    NodeKind.Div: Opcode.Div,
+    NodeKind.Equal: Opcode.Equal,
+    NodeKind.NotEqual: Opcode.NotEqual,
+    NodeKind.Less: Opcode.Less,
+    NodeKind.LessEqual: Opcode.LessEqual,
+}
+
+
+class Step(IntEnum):
+    Value = 1
+    Address = 2
+    Discard = 3
+    Load = 4
+    Finish = 5
+
+
+TERMINATORS = frozenset({Opcode.Jump, Opcode.Branch, Opcode.Return})
+
+OPERAND_COUNTS = {
+    Opcode.Const: 0,
+    Opcode.LocalAddress: 0,
+    Opcode.GlobalAddress: 0,
+    Opcode.Load: 1,
+    Opcode.Store: 2,
+    Opcode.Neg: 1,
+    Opcode.Jump: 0,
+    Opcode.Branch: 1,
+    Opcode.Return: 1,
+} | {opcode: 2 for opcode in BINARY_OPCODES.values()}
+
+TARGET_COUNTS = {Opcode.Jump: 1, Opcode.Branch: 2}
+
+
+@dataclass(slots=True)
+class Instruction:
+    opcode: Opcode
+    dest: Optional[int] = None
+    args: tuple[int, ...] = ()
+    value: Optional[int] = None
+    var: Optional[Obj] = None
+    name: Optional[str] = None
+    targets: tuple[int, ...] = ()
+    token: Optional[Token] = None
+
+
+@dataclass(slots=True)
+class BasicBlock:
+    id: int
+    instructions: list[Instruction] = field(default_factory=list)
+
+    @property
+    def terminator(self) -> Optional[Instruction]:
+        if self.instructions and self.instructions[-1].opcode in TERMINATORS:
+            return self.instructions[-1]
+        return None
+
+    @property
+    def successors(self) -> tuple[int, ...]:
+        terminator = self.terminator
+        return terminator.targets if terminator else ()
+
+
+@dataclass(slots=True)
+class IRFunction:
+    obj: Obj
+    blocks: list[BasicBlock] = field(default_factory=list)
+    vreg_count: int = 0
+    registers: dict[int, str] = field(default_factory=dict)
+    aliases: dict[int, Obj] = field(default_factory=dict)
+
+
+class IRBuilder:
+    def __init__(self, obj: Obj) -> None:
+        self.function = IRFunction(obj)
+        self.block = self.new_block()
+
+    def new_block(self) -> BasicBlock:
+        block = BasicBlock(len(self.function.blocks))
+        self.function.blocks.append(block)
+        return block
+
+    def new_vreg(self) -> int:
+        self.function.vreg_count += 1
+        return self.function.vreg_count
+
+    def emit(self, opcode: Opcode, token: Token, **fields) -> Optional[int]:
+        dest = None
+        if opcode not in TERMINATORS and opcode != Opcode.Store:
+            if opcode != Opcode.Call or fields.pop("has_result", True):
+                dest = self.new_vreg()
+        self.block.instructions.append(Instruction(opcode, dest, token=token, **fields))
+        return dest
+
+    def jump(self, target: BasicBlock, token: Token) -> None:
+        self.emit(Opcode.Jump, token, targets=(target.id,))
+
+    def switch_to(self, block: BasicBlock) -> None:
+        self.block = block
+
+    def lower_function(self) -> IRFunction:
+        obj = self.function.obj
+        self.lower_stmt(obj.body)
+        if self.block.terminator is None:
+            zero = self.emit(Opcode.Const, obj.body.token, value=0)
+            self.emit(Opcode.Return, obj.body.token, args=(zero,))
+        return self.function
+
+    def lower_stmt(self, node: Node) -> None:
+        match node.kind:
+            case NodeKind.If:
+                condition = self.lower_expr(node.condition)
+                then_block = self.new_block()
+                else_block = self.new_block()
+                end_block = self.new_block() if node.els else else_block
+                self.emit(
+                    Opcode.Branch,
+                    node.token,
+                    args=(condition,),
+                    targets=(then_block.id, else_block.id),
+                )
+                self.switch_to(then_block)
+                self.lower_stmt(node.then)
+                self.jump(end_block, node.token)
+                if node.els:
+                    self.switch_to(else_block)
+                    self.lower_stmt(node.els)
+                    self.jump(end_block, node.token)
+                self.switch_to(end_block)
+            case NodeKind.ForStmt:
+                if node.init:
+                    self.lower_stmt(node.init)
+                condition_block = self.new_block()
+                body_block = self.new_block()
+                end_block = self.new_block()
+                self.jump(condition_block, node.token)
+                self.switch_to(condition_block)
+                if node.condition:
+                    condition = self.lower_expr(node.condition)
+                    self.emit(
+                        Opcode.Branch,
+                        node.token,
+                        args=(condition,),
+                        targets=(body_block.id, end_block.id),
+                    )
+                else:
+                    self.jump(body_block, node.token)
+                self.switch_to(body_block)
+                self.lower_stmt(node.then)
+                if node.inc:
+                    self.lower_expr(node.inc)
+                self.jump(condition_block, node.token)
+                self.switch_to(end_block)
+            case NodeKind.ExpressionStmt:
+                self.lower_expr(node.left)
+            case NodeKind.Return:
+                value = self.lower_expr(node.left)
+                self.emit(Opcode.Return, node.token, args=(value,))
+                self.switch_to(self.new_block())
+            case NodeKind.Block:
+                stmt = node.body
+                while stmt:
+                    self.lower_stmt(stmt)
+                    stmt = stmt.next_node
+            case _:
+                raise ValueError("invalid node type")
+
+    def lower_address(self, node: Node) -> int:
+        return self.lower(Step.Address, node)
+
+    def lower_expr(self, node: Node) -> int:
+        return self.lower(Step.Value, node)
+
+    def lower(self, step: Step, node: Node) -> int:
+        values: list[int] = []
+        work = [(step, node)]
+        while work:
+            step, node = work.pop()
+            match step:
+                case Step.Value:
+                    self.expand_value(node, values, work)
+                case Step.Address:
+                    self.expand_address(node, values, work)
+                case Step.Discard:
+                    values.pop()
+                case Step.Load:
+                    values.append(self.load(values.pop(), node))
+                case Step.Finish:
+                    values.append(self.finish(node, values))
+        return values.pop()
+
+    def expand_address(
+        self, node: Node, values: list[int], work: list[tuple[Step, Node]]
+    ) -> None:
+        match node.kind:
+            case NodeKind.Variable:
+                opcode = (
+                    Opcode.LocalAddress if node.var.is_local else Opcode.GlobalAddress
+                )
+                values.append(self.emit(opcode, node.token, var=node.var))
+            case NodeKind.Deref:
+                work.append((Step.Value, node.left))
+            case NodeKind.Comma:
+                work.append((Step.Address, node.right))
+                work.append((Step.Discard, node))
+                work.append((Step.Value, node.left))
+            case _:
+                raise ValueError("not an lvalue")
+
+    def load(self, address: int, node: Node) -> int:
+        if node.node_type.kind == TypeKind.TYPE_ARRAY:
+            return address
+        return self.emit(
+            Opcode.Load, node.token, args=(address,), value=node.node_type.size
+        )
+
+    def expand_value(
+        self, node: Node, values: list[int], work: list[tuple[Step, Node]]
+    ) -> None:
+        match node.kind:
+            case NodeKind.Number:
+                values.append(self.emit(Opcode.Const, node.token, value=node.value))
+            case NodeKind.Variable:
+                work.append((Step.Load, node))
+                work.append((Step.Address, node))
+            case NodeKind.Addr:
+                work.append((Step.Address, node.left))
+            case NodeKind.Deref:
+                work.append((Step.Load, node))
+                work.append((Step.Value, node.left))
+            case NodeKind.Neg:
+                work.append((Step.Finish, node))
+                work.append((Step.Value, node.left))
+            case NodeKind.Assign:
+                work.append((Step.Finish, node))
+                work.append((Step.Value, node.right))
+                work.append((Step.Address, node.left))
+            case NodeKind.Comma:
+                work.append((Step.Value, node.right))
+                work.append((Step.Discard, node))
+                work.append((Step.Value, node.left))
+            case NodeKind.StmtExpression:
+                stmt = node.body
+                while stmt.next_node:
+                    self.lower_stmt(stmt)
+                    stmt = stmt.next_node
+                work.append((Step.Value, stmt.left))
+            case NodeKind.FunctionCall:
+                work.append((Step.Finish, node))
+                work.extend((Step.Value, arg) for arg in reversed(node.function_args))
+            case _:
+                work.append((Step.Finish, node))
+                work.append((Step.Value, node.left))
+                work.append((Step.Value, node.right))
+
+    def finish(self, node: Node, values: list[int]) -> int:
+        match node.kind:
+            case NodeKind.Neg:
+                return self.emit(Opcode.Neg, node.token, args=(values.pop(),))
+            case NodeKind.Assign:
+                value = values.pop()
+                address = values.pop()
+                self.emit(
+                    Opcode.Store,
+                    node.token,
+                    args=(address, value),
+                    value=node.node_type.size,
+                )
+                return value
+            case NodeKind.FunctionCall:
+                args = tuple(values.pop() for _ in node.function_args)[::-1]
+                return self.emit(
+                    Opcode.Call, node.token, args=args, name=node.function_name
+                )
+        left = values.pop()
+        right = values.pop()
+        return self.emit(BINARY_OPCODES[node.kind], node.token, args=(left, right))
+
+
+def lower_program(prog: list[Obj]) -> list[IRFunction]:
+    functions = []
+    for obj in prog:
+        if obj.is_function:
+            function = IRBuilder(obj).lower_function()
+            verify_function(function)
+            functions.append(function)
+    return functions
+
+
+def dominators(function: IRFunction) -> dict[int, set[int]]:
+    blocks = {block.id: block for block in function.blocks}
+    order = []
+    seen = set()
+    stack = [function.blocks[0].id]
+    while stack:
+        block_id = stack.pop()
+        if block_id in seen:
+            continue
+        seen.add(block_id)
+        order.append(block_id)
+        stack.extend(blocks[block_id].successors)
+    predecessors: dict[int, list[int]] = {block_id: [] for block_id in order}
+    for block_id in order:
+        for successor in blocks[block_id].successors:
+            predecessors[successor].append(block_id)
+    result = {block_id: set(order) for block_id in order}
+    result[order[0]] = {order[0]}
+    changed = True
+    while changed:
+        changed = False
+        for block_id in order[1:]:
+            incoming = [result[pred] for pred in predecessors[block_id]]
+            dominated = set.intersection(*incoming) | {block_id}
+            if dominated != result[block_id]:
+                result[block_id] = dominated
+                changed = True
+    return result
+
+
+def verify_function(function: IRFunction) -> None:
+    name = function.obj.name
+    block_ids = {block.id for block in function.blocks}
+    definitions: dict[int, tuple[int, int]] = {}
+    for block in function.blocks:
+        if block.terminator is None:
+            raise ValueError(f"{name}: block {block.id} has no terminator")
+        for index, instruction in enumerate(block.instructions):
+            opcode = instruction.opcode
+            if opcode in TERMINATORS and index != len(block.instructions) - 1:
+                raise ValueError(f"{name}: terminator inside block {block.id}")
+            expected = OPERAND_COUNTS.get(opcode)
+            if expected is not None and len(instruction.args) != expected:
+                raise ValueError(f"{name}: wrong operand count for {opcode.name}")
+            if len(instruction.targets) != TARGET_COUNTS.get(opcode, 0):
+                raise ValueError(f"{name}: wrong target count for {opcode.name}")
+            if any(target not in block_ids for target in instruction.targets):
+                raise ValueError(f"{name}: branch to unknown block")
+            if instruction.dest is not None:
+                if instruction.dest in definitions:
+                    raise ValueError(f"{name}: %{instruction.dest} defined twice")
+                definitions[instruction.dest] = (block.id, index)
+    dominance = dominators(function)
+    for block in function.blocks:
+        if block.id not in dominance:
+            continue
+        for index, instruction in enumerate(block.instructions):
+            for arg in instruction.args:
+                if arg not in definitions:
+                    raise ValueError(f"{name}: %{arg} is never defined")
+                def_block, def_index = definitions[arg]
+                if def_block == block.id:
+                    if def_index >= index:
+                        raise ValueError(f"{name}: %{arg} used before definition")
+                elif def_block not in dominance[block.id]:
+                    raise ValueError(f"{name}: %{arg} does not dominate its use")
+
+
+def format_instruction(instruction: Instruction) -> str:
+    opcode = instruction.opcode
+    operands = [f"%{arg}" for arg in instruction.args]
+    if instruction.var is not None:
+        operands.insert(0, instruction.var.name)
+    if instruction.name is not None:
+        operands.insert(0, instruction.name)
+    if opcode == Opcode.Const:
+        operands.append(str(instruction.value))
+    operands.extend(f".L{target}" for target in instruction.targets)
+    mnemonic = re.sub(r"(?<!^)(?=[A-Z])", "_", opcode.name).lower()
+    if opcode == Opcode.Load or opcode == Opcode.Store:
+        mnemonic = f"{mnemonic}.{instruction.value}"
+    text = f"{mnemonic} {', '.join(operands)}".rstrip()
+    if instruction.dest is not None:
+        return f"%{instruction.dest} = {text}"
+    return text
+
+
+def format_function(function: IRFunction) -> str:
+    obj = function.obj
+    params = ", ".join(param.name for param in obj.params)
+    lines = [f"function {obj.name}({params}) {{"]
+    for block in function.blocks:
+        lines.append(f".L{block.id}:")
+        lines.extend(
+            f"  {format_instruction(instruction)}" for instruction in block.instructions
+        )
+    lines.append("}")
+    return "\n".join(lines) + "\n"
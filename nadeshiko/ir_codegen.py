@@ -0,0 +1,331 @@
+from collections import Counter
+from typing import Optional
+
+from nadeshiko.codegen import (
+    ARGS_REGISTER_64,
+    ARGS_REGISTER_8,
+    align_to,
+    emit_data_section,
+)
+from nadeshiko.context import STRENGTH_REDUCTION
+from nadeshiko.emitter import Emitter
+from nadeshiko.ir import IRFunction, Instruction, Opcode
+from nadeshiko.node import Obj
+from nadeshiko.regalloc import is_folded, used_registers
+from nadeshiko.strength import divide_by_constant, multiply_by_constant
+
+SETCC_INSTRUCTIONS = {
+    Opcode.Equal: "sete",
+    Opcode.NotEqual: "setne",
+    Opcode.Less: "setl",
+    Opcode.LessEqual: "setle",
+}
+INVERTED_JUMPS = {
+    Opcode.Equal: "jne",
+    Opcode.NotEqual: "je",
+    Opcode.Less: "jge",
+    Opcode.LessEqual: "jg",
+}
+ARITHMETIC_INSTRUCTIONS = {Opcode.Add: "add", Opcode.Sub: "sub", Opcode.Mul: "imul"}
+
+
+def block_label(function: IRFunction, block_id: int) -> str:
+    return f".L.{function.obj.name}.{block_id}"
+
+
+def assign_frame(function: IRFunction) -> dict[int, int]:
+    obj = function.obj
+    offset = 0
+    for var in obj.locals_obj[::-1]:
+        if var.register:
+            continue
+        offset += var.object_type.size
+        var.offset = -offset
+    offset = align_to(offset, 8)
+    slots = {}
+    for block in function.blocks:
+        for instruction in block.instructions:
+            dest = instruction.dest
+            if (
+                dest is None
+                or dest in function.registers
+                or dest in function.aliases
+                or is_folded(instruction)
+            ):
+                continue
+            offset += 8
+            slots[dest] = -offset
+    offset += 8 * len(used_registers(function))
+    obj.stack_size = align_to(offset, 16)
+    return slots
+
+
+def emit_moves(emitter: Emitter, moves: list[tuple[str, str]]) -> None:
+    pending = [(dest, source) for dest, source in moves if dest != source]
+    while pending:
+        for i, (dest, source) in enumerate(pending):
+            if all(other != dest for _, other in pending):
+                emitter.emit(f"  mov {source}, {dest}")
+                del pending[i]
+                break
+        else:
+            source = pending[0][1]
+            emitter.emit(f"  mov {source}, %rax")
+            pending = [
+                (dest, "%rax" if other == source else other) for dest, other in pending
+            ]
+
+
+class FunctionEmitter:
+    def __init__(self, emitter: Emitter, function: IRFunction) -> None:
+        self.emitter = emitter
+        self.function = function
+        self.definitions = {
+            instruction.dest: instruction
+            for block in function.blocks
+            for instruction in block.instructions
+            if instruction.dest is not None
+        }
+        self.uses = Counter(
+            arg
+            for block in function.blocks
+            for instruction in block.instructions
+            for arg in instruction.args
+        )
+        self.slots = assign_frame(function)
+        self.condition: Optional[tuple[int, Opcode]] = None
+
+    def emit(self, line: str) -> None:
+        self.emitter.emit(line)
+
+    def location(self, vreg: int) -> str:
+        if (register := self.function.registers.get(vreg)) is not None:
+            return f"%{register}"
+        if (var := self.function.aliases.get(vreg)) is not None:
+            return f"%{var.register}" if var.register else f"{var.offset}(%rbp)"
+        return f"{self.slots[vreg]}(%rbp)"
+
+    def target(self, vreg: int) -> str:
+        return self.function.registers.get(vreg, "rax")
+
+    def operand(self, vreg: int, scratch: str) -> str:
+        definition = self.definitions[vreg]
+        if not is_folded(definition):
+            return self.location(vreg)
+        self.emitter.loc(definition.token)
+        match definition.opcode:
+            case Opcode.Const:
+                return f"${definition.value}"
+            case Opcode.LocalAddress:
+                self.emit(f"  lea {definition.var.offset}(%rbp), %{scratch}")
+            case Opcode.GlobalAddress:
+                self.emit(f"  lea {definition.var.name}(%rip), %{scratch}")
+        return f"%{scratch}"
+
+    def register(self, vreg: int, scratch: str) -> str:
+        operand = self.operand(vreg, scratch)
+        if operand.startswith("%"):
+            return operand
+        self.emit(f"  mov {operand}, %{scratch}")
+        return f"%{scratch}"
+
+    def move(self, vreg: int, register: str) -> None:
+        operand = self.operand(vreg, register)
+        if operand != f"%{register}":
+            self.emit(f"  mov {operand}, %{register}")
+
+    def memory(self, vreg: int) -> str:
+        definition = self.definitions[vreg]
+        match definition.opcode:
+            case Opcode.LocalAddress:
+                return f"{definition.var.offset}(%rbp)"
+            case Opcode.GlobalAddress:
+                return f"{definition.var.name}(%rip)"
+        return f"({self.register(vreg, 'rdi')})"
+
+    def variable_register(self, vreg: int) -> Optional[str]:
+        definition = self.definitions[vreg]
+        if definition.opcode == Opcode.LocalAddress:
+            return definition.var.register
+        return None
+
+    def result(self, vreg: Optional[int], register: str) -> None:
+        if vreg is not None and self.location(vreg) != f"%{register}":
+            self.emit(f"  mov %{register}, {self.location(vreg)}")
+
+    def constant(self, vreg: int) -> Optional[int]:
+        definition = self.definitions[vreg]
+        return definition.value if definition.opcode == Opcode.Const else None
+
+    def reduce(self, instruction: Instruction) -> Optional[tuple[int, list[str]]]:
+        left, right = instruction.args
+        if instruction.opcode == Opcode.Div:
+            if (value := self.constant(right)) is None:
+                return None
+            other, instructions = left, divide_by_constant(value)
+        elif (value := self.constant(right)) is not None:
+            other, instructions = left, multiply_by_constant(value)
+        elif (value := self.constant(left)) is not None:
+            other, instructions = right, multiply_by_constant(value)
+        else:
+            return None
+        if instructions is None:
+            return None
+        return other, instructions
+
+    def fuses(self, instruction: Instruction, following: Optional[Instruction]) -> bool:
+        return (
+            following is not None
+            and following.opcode == Opcode.Branch
+            and following.args[0] == instruction.dest
+            and self.uses[instruction.dest] == 1
+        )
+
+    def emit_instruction(
+        self,
+        instruction: Instruction,
+        following: Optional[Instruction],
+        next_block: int,
+    ) -> None:
+        self.emitter.loc(instruction.token)
+        function = self.function
+        args = instruction.args
+        dest = instruction.dest
+        match instruction.opcode:
+            case Opcode.Const | Opcode.LocalAddress | Opcode.GlobalAddress:
+                if not is_folded(instruction):
+                    self.emit(f"  mov ${instruction.value}, %{self.target(dest)}")
+                    self.result(dest, self.target(dest))
+            case Opcode.Load if dest in function.aliases:
+                pass
+            case Opcode.Load:
+                if (register := self.variable_register(args[0])) is not None:
+                    self.emit(f"  mov %{register}, {self.location(dest)}")
+                    return
+                mnemonic = "movsbq" if instruction.value == 1 else "mov"
+                memory = self.memory(args[0])
+                self.emit(f"  {mnemonic} {memory}, %{self.target(dest)}")
+                self.result(dest, self.target(dest))
+            case Opcode.Store:
+                register = self.variable_register(args[0])
+                if register is not None and instruction.value == 1:
+                    self.move(args[1], "rax")
+                    self.emit(f"  movsbq %al, %{register}")
+                elif register is not None:
+                    self.move(args[1], register)
+                elif instruction.value == 1:
+                    self.move(args[1], "rax")
+                    self.emit(f"  mov %al, {self.memory(args[0])}")
+                else:
+                    source = self.register(args[1], "rax")
+                    self.emit(f"  mov {source}, {self.memory(args[0])}")
+            case Opcode.Neg:
+                target = self.target(dest)
+                self.move(args[0], target)
+                self.emit(f"  neg %{target}")
+                self.result(dest, target)
+            case Opcode.Mul | Opcode.Div if STRENGTH_REDUCTION.get() and (
+                reduced := self.reduce(instruction)
+            ):
+                other, instructions = reduced
+                self.move(other, "rax")
+                for line in instructions:
+                    self.emit(line)
+                self.result(dest, "rax")
+            case Opcode.Add | Opcode.Sub | Opcode.Mul:
+                target = self.target(dest)
+                self.move(args[0], target)
+                operand = self.operand(args[1], "rdi")
+                mnemonic = ARITHMETIC_INSTRUCTIONS[instruction.opcode]
+                self.emit(f"  {mnemonic} {operand}, %{target}")
+                self.result(dest, target)
+            case Opcode.Div:
+                self.move(args[0], "rax")
+                divisor = self.register(args[1], "rdi")
+                self.emit("  cqo")
+                self.emit(f"  idiv {divisor}")
+                self.result(dest, "rax")
+            case Opcode.Equal | Opcode.NotEqual | Opcode.Less | Opcode.LessEqual:
+                left = self.register(args[0], "rax")
+                self.emit(f"  cmp {self.operand(args[1], 'rdi')}, {left}")
+                if self.fuses(instruction, following):
+                    self.condition = (dest, instruction.opcode)
+                    return
+                self.emit(f"  {SETCC_INSTRUCTIONS[instruction.opcode]} %al")
+                self.emit("  movzb %al, %rax")
+                self.result(dest, "rax")
+            case Opcode.Call:
+                moves = []
+                for i, arg in enumerate(args):
+                    if not is_folded(self.definitions[arg]):
+                        moves.append((f"%{ARGS_REGISTER_64[i]}", self.location(arg)))
+                emit_moves(self.emitter, moves)
+                for i, arg in enumerate(args):
+                    if is_folded(self.definitions[arg]):
+                        self.move(arg, ARGS_REGISTER_64[i])
+                self.emit("  mov $0, %rax")
+                self.emit(f"  call {instruction.name}")
+                self.result(dest, "rax")
+            case Opcode.Jump:
+                if instruction.targets[0] != next_block:
+                    self.emit(f"  jmp {block_label(function, instruction.targets[0])}")
+            case Opcode.Branch:
+                then_block, else_block = instruction.targets
+                if self.condition is not None and self.condition[0] == args[0]:
+                    jump = INVERTED_JUMPS[self.condition[1]]
+                    self.condition = None
+                else:
+                    self.emit(f"  cmp $0, {self.register(args[0], 'rax')}")
+                    jump = "je"
+                self.emit(f"  {jump} {block_label(function, else_block)}")
+                if then_block != next_block:
+                    self.emit(f"  jmp {block_label(function, then_block)}")
+            case Opcode.Return:
+                self.move(args[0], "rax")
+                self.emit(f"  jmp .L.return.{function.obj.name}")
+
+    def emit_function(self) -> None:
+        obj = self.function.obj
+        registers = used_registers(self.function)
+        self.emit(f"  .global {obj.name}")
+        self.emit(f"  .text")
+        self.emit(f"{obj.name}:")
+        self.emit("  push %rbp")
+        self.emit("  mov %rsp, %rbp")
+        self.emit(f"  sub ${obj.stack_size}, %rsp")
+        for i, register in enumerate(registers):
+            self.emit(f"  mov %{register}, {8 * i - obj.stack_size}(%rbp)")
+        moves = []
+        for i, param in enumerate(obj.params):
+            if param.register and param.object_type.size == 1:
+                self.emit(f"  movsbq %{ARGS_REGISTER_8[i]}, %{ARGS_REGISTER_64[i]}")
+            if param.register:
+                moves.append((f"%{param.register}", f"%{ARGS_REGISTER_64[i]}"))
+            elif param.object_type.size == 1:
+                self.emit(f"  mov %{ARGS_REGISTER_8[i]}, {param.offset}(%rbp)")
+            else:
+                self.emit(f"  mov %{ARGS_REGISTER_64[i]}, {param.offset}(%rbp)")
+        emit_moves(self.emitter, moves)
+        blocks = self.function.blocks
+        for i, block in enumerate(blocks):
+            next_block = blocks[i + 1].id if i + 1 < len(blocks) else -1
+            self.emit(f"{block_label(self.function, block.id)}:")
+            instructions = block.instructions
+            for j, instruction in enumerate(instructions):
+                following = instructions[j + 1] if j + 1 < len(instructions) else None
+                self.emit_instruction(instruction, following, next_block)
+        self.emit(f".L.return.{obj.name}:")
+        for i, register in enumerate(registers):
+            self.emit(f"  mov {8 * i - obj.stack_size}(%rbp), %{register}")
+        self.emit("  mov %rbp, %rsp")
+        self.emit("  pop %rbp")
+        self.emit("  ret")
+
+
+def ir_codegen(
+    filename: str, prog: list[Obj], functions: list[IRFunction], emitter: Emitter
+) -> None:
+    emitter.file(filename)
+    emit_data_section(prog, emitter)
+    for function in functions:
+        FunctionEmitter(emitter, function).emit_function()
@@ -0,0 +1,92 @@
+import ctypes
+import mmap
+import struct
+from dataclasses import dataclass
+from functools import lru_cache
+
+from nadeshiko.elf import SHF_EXECINSTR, SHT_NOBITS, ObjectFile, Section
+
+STUB_SIZE = 16
+INT32_RANGE = range(-(1 << 31), 1 << 31)
+
+
+@lru_cache(maxsize=1)
+def libc() -> ctypes.CDLL:
+    library = ctypes.CDLL(None, use_errno=True)
+    library.mprotect.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int]
+    library.fflush.argtypes = [ctypes.c_void_p]
+    return library
+
+
+@dataclass(slots=True)
+class LoadedProgram:
+    region: mmap.mmap
+    anchor: ctypes.Array
+    addresses: dict[str, int]
+
+
+def align_to(offset: int, align: int) -> int:
+    return (offset + align - 1) // align * align
+
+
+def resolve_external(name: str, libraries: list[ctypes.CDLL]) -> int:
+    for library in libraries:
+        try:
+            return ctypes.cast(getattr(library, name), ctypes.c_void_p).value
+        except AttributeError:
+            continue
+    raise ValueError(f"undefined symbol {name}")
+
+
+def layout(sections: list[Section], offset: int) -> tuple[dict[str, int], int]:
+    bases = {}
+    for section in sections:
+        offset = align_to(offset, section.align)
+        bases[section.name] = offset
+        offset += section.length
+    return bases, offset
+
+
+def load(obj: ObjectFile, libraries: list[ctypes.CDLL]) -> LoadedProgram:
+    code = [section for section in obj.sections if section.flags & SHF_EXECINSTR]
+    data = [section for section in obj.sections if not section.flags & SHF_EXECINSTR]
+    externals = [symbol.name for symbol in obj.symbols.values() if not symbol.section]
+    bases, offset = layout(code, 0)
+    stubs = align_to(offset, STUB_SIZE)
+    code_size = align_to(stubs + STUB_SIZE * len(externals), mmap.PAGESIZE)
+    data_bases, offset = layout(data, code_size)
+    bases |= data_bases
+    region = mmap.mmap(-1, max(align_to(offset, mmap.PAGESIZE), mmap.PAGESIZE))
+    anchor = (ctypes.c_char * len(region)).from_buffer(region)
+    base = ctypes.addressof(anchor)
+    for section in obj.sections:
+        if section.kind != SHT_NOBITS:
+            start = bases[section.name]
+            region[start : start + len(section.data)] = section.data
+    addresses = {
+        symbol.name: base + bases[symbol.section] + symbol.offset
+        for symbol in obj.symbols.values()
+        if symbol.section
+    }
+    for i, name in enumerate(externals):
+        stub = stubs + STUB_SIZE * i
+        target = resolve_external(name, libraries)
+        region[stub : stub + 14] = b"\xff\x25\0\0\0\0" + struct.pack("<Q", target)
+        addresses[name] = base + stub
+    for section in obj.sections:
+        for relocation in section.relocations:
+            position = bases[section.name] + relocation.offset
+            value = addresses[relocation.symbol] + relocation.addend - base - position
+            if value not in INT32_RANGE:
+                raise ValueError(f"relocation to {relocation.symbol} out of range")
+            region[position : position + 4] = struct.pack("<i", value)
+    if libc().mprotect(base, code_size, mmap.PROT_READ | mmap.PROT_EXEC) != 0:
+        raise OSError(ctypes.get_errno(), "mprotect failed")
+    return LoadedProgram(region, anchor, addresses)
+
+
+def run_main(program: LoadedProgram) -> int:
+    main = ctypes.CFUNCTYPE(ctypes.c_int64)(program.addresses["main"])
+    result = main()
+    libc().fflush(None)
+    return result
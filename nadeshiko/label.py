@@ -0,0 +1,78 @@
+from dataclasses import dataclass
+from typing import Callable
+
+from nadeshiko.node import Node, NodeKind
+
+
+@dataclass(slots=True)
+class Label:
+    has_call: bool
+    has_side_effects: bool
+
+
+def children(node: Node) -> list[Node]:
+    results = [
+        child
+        for child in (
+            node.left,
+            node.right,
+            node.condition,
+            node.then,
+            node.els,
+            node.init,
+            node.inc,
+        )
+        if child
+    ]
+    current = node.body
+    while current:
+        results.append(current)
+        current = current.next_node
+    if node.function_args:
+        results.extend(node.function_args)
+    return results
+
+
+def node_label(node: Node, labels: dict[int, Label]) -> Label:
+    child_labels = [labels[id(child)] for child in children(node)]
+    has_call = node.kind == NodeKind.FunctionCall or any(
+        label.has_call for label in child_labels
+    )
+    has_side_effects = (
+        has_call
+        or node.kind == NodeKind.Assign
+        or node.kind == NodeKind.Return
+        or any(label.has_side_effects for label in child_labels)
+    )
+    return Label(has_call, has_side_effects)
+
+
+def operands(node: Node) -> list[Node]:
+    match node.kind:
+        case NodeKind.FunctionCall:
+            return node.function_args
+        case NodeKind.StmtExpression:
+            return []
+    return [child for child in (node.left, node.right) if child]
+
+
+def post_order(
+    node: Node, successors: Callable[[Node], list[Node]] = children
+) -> list[Node]:
+    results = []
+    stack = [(node, False)]
+    while stack:
+        node, visited = stack.pop()
+        if visited:
+            results.append(node)
+            continue
+        stack.append((node, True))
+        stack.extend((child, False) for child in reversed(successors(node)))
+    return results
+
+
+def label_tree(node: Node) -> dict[int, Label]:
+    labels: dict[int, Label] = {}
+    for item in post_order(node):
+        labels[id(item)] = node_label(item, labels)
+    return labels
@@ -0,0 +1,222 @@
+import copy
+
+from nadeshiko.fold import replace_node
+from nadeshiko.inline import contains, expression_stmt
+from nadeshiko.label import children, post_order
+from nadeshiko.node import Node, NodeKind, Obj, new_node, new_var_node
+from nadeshiko.type import TYPE_INT, Type, TypeKind, pointer_to
+
+PURE_KINDS = frozenset(
+    {
+        NodeKind.Add,
+        NodeKind.Sub,
+        NodeKind.Mul,
+        NodeKind.Neg,
+        NodeKind.Equal,
+        NodeKind.NotEqual,
+        NodeKind.Less,
+        NodeKind.LessEqual,
+    }
+)
+
+
+def is_array(node: Node) -> bool:
+    return node.node_type.kind == TypeKind.TYPE_ARRAY
+
+
+def assigned_variables(node: Node) -> tuple[set[int], bool]:
+    assigned: set[int] = set()
+    has_memory_effects = False
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        stack.extend(children(node))
+        match node.kind:
+            case NodeKind.FunctionCall:
+                has_memory_effects = True
+            case NodeKind.Assign:
+                target = node.left
+                while target.kind == NodeKind.Comma:
+                    target = target.right
+                if target.kind == NodeKind.Variable:
+                    assigned.add(id(target.var))
+                else:
+                    has_memory_effects = True
+    return assigned, has_memory_effects
+
+
+class LoopInvariants:
+    def __init__(self, loop: Node, address_taken: bool) -> None:
+        self.address_taken = address_taken
+        self.assigned: set[int] = set()
+        self.has_memory_effects = False
+        for part in (loop.condition, loop.then, loop.inc):
+            if part:
+                assigned, has_memory_effects = assigned_variables(part)
+                self.assigned |= assigned
+                self.has_memory_effects |= has_memory_effects
+        self.results: dict[int, bool] = {}
+
+    def is_invariant(self, node: Node) -> bool:
+        if id(node) not in self.results:
+            for item in post_order(node, self.unchecked):
+                self.results[id(item)] = self.check(item)
+        return self.results[id(node)]
+
+    def unchecked(self, node: Node) -> list[Node]:
+        return [child for child in children(node) if id(child) not in self.results]
+
+    def check(self, node: Node) -> bool:
+        match node.kind:
+            case NodeKind.Number:
+                return True
+            case NodeKind.Variable:
+                var = node.var
+                if is_array(node):
+                    return True
+                if id(var) in self.assigned:
+                    return False
+                if var.is_local:
+                    return not self.address_taken
+                return not self.has_memory_effects
+            case NodeKind.Addr:
+                if node.left.kind == NodeKind.Variable:
+                    return True
+                if node.left.kind == NodeKind.Deref:
+                    return self.is_invariant(node.left.left)
+                return False
+            case NodeKind.Deref:
+                return is_array(node) and self.is_invariant(node.left)
+            case NodeKind.Div:
+                return (
+                    node.right.kind == NodeKind.Number
+                    and node.right.value not in (0, -1)
+                    and self.is_invariant(node.left)
+                )
+        if node.kind not in PURE_KINDS:
+            return False
+        return all(self.is_invariant(child) for child in children(node))
+
+
+def is_worth_hoisting(node: Node) -> bool:
+    match node.kind:
+        case NodeKind.Number:
+            return False
+        case NodeKind.Variable:
+            return is_array(node) and not node.var.is_local
+    return True
+
+
+def expression_key(node: Node, numbers: dict[tuple, int]) -> int:
+    keys: dict[int, int] = {}
+    for item in post_order(node):
+        key = (
+            item.kind,
+            item.value,
+            id(item.var),
+            tuple(keys[id(child)] for child in children(item)),
+        )
+        keys[id(item)] = numbers.setdefault(key, len(numbers))
+    return keys[id(node)]
+
+
+def temporary_type(node: Node) -> Type:
+    if is_array(node):
+        return pointer_to(node.node_type.base)
+    if node.node_type.base:
+        return node.node_type
+    return TYPE_INT
+
+
+class LoopHoister:
+    def __init__(self, obj: Obj) -> None:
+        self.obj = obj
+        self.address_taken = contains(obj.body, NodeKind.Addr)
+        self.hoisted = 0
+
+    def visit_stmt(self, node: Node) -> None:
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node.kind == NodeKind.ForStmt and self.hoist_loop(node):
+                node = node.body
+                while node.kind != NodeKind.ForStmt:
+                    node = node.next_node
+            stack.extend(reversed(children(node)))
+
+    def hoist_loop(self, node: Node) -> bool:
+        invariants = LoopInvariants(node, self.address_taken)
+        numbers: dict[tuple, int] = {}
+        temporaries: dict[int, Obj] = {}
+        preheader: list[Node] = []
+
+        def hoist(expr: Node) -> None:
+            key = expression_key(expr, numbers)
+            if (var := temporaries.get(key)) is None:
+                var = Obj(f"licm.{len(temporaries)}", 0, temporary_type(expr))
+                var.is_local = True
+                self.obj.locals_obj.append(var)
+                temporaries[key] = var
+                target = new_var_node(var, expr.token)
+                target.node_type = var.object_type
+                assign = new_node(NodeKind.Assign, expr.token)
+                assign.left = target
+                assign.right = copy.copy(expr)
+                assign.node_type = var.object_type
+                preheader.append(expression_stmt(assign))
+            replacement = new_var_node(var, expr.token)
+            replacement.node_type = var.object_type
+            replace_node(expr, replacement)
+
+        def visit(expr: Node) -> None:
+            stack = [(expr, False)]
+            while stack:
+                expr, lvalue = stack.pop()
+                if lvalue:
+                    match expr.kind:
+                        case NodeKind.Deref:
+                            stack.append((expr.left, False))
+                        case NodeKind.Comma:
+                            stack.append((expr.right, True))
+                            stack.append((expr.left, False))
+                    continue
+                if invariants.is_invariant(expr) and is_worth_hoisting(expr):
+                    hoist(expr)
+                    continue
+                match expr.kind:
+                    case NodeKind.Addr:
+                        stack.append((expr.left, True))
+                    case NodeKind.Assign:
+                        stack.append((expr.right, False))
+                        stack.append((expr.left, True))
+                    case _:
+                        stack.extend(
+                            (child, False) for child in reversed(children(expr))
+                        )
+
+        for part in (node.condition, node.then, node.inc):
+            if part:
+                visit(part)
+        if not preheader:
+            return False
+        self.hoisted += len(preheader)
+        loop = copy.copy(node)
+        stmts = ([loop.init] if loop.init else []) + preheader + [loop]
+        loop.init = None
+        for stmt, next_node in zip(stmts, stmts[1:]):
+            stmt.next_node = next_node
+        loop.next_node = None
+        block = new_node(NodeKind.Block, node.token)
+        block.body = stmts[0]
+        replace_node(node, block)
+        return True
+
+
+def hoist_loop_invariants(prog: list[Obj]) -> dict[str, int]:
+    results = {}
+    for obj in prog:
+        if obj.is_function:
+            hoister = LoopHoister(obj)
+            hoister.visit_stmt(obj.body)
+            results[obj.name] = hoister.hoisted
+    return results
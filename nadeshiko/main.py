@@ -1,23 +1,154 @@
+import ctypes
+import io
+import sys
+import time
 from typing import TextIO
 
 import click
 
-from nadeshiko.codegen import codegen
+from nadeshiko.assembler import assemble
+from nadeshiko.context import SCRATCH_REGISTERS, STRENGTH_REDUCTION
+from nadeshiko.dce import eliminate_dead_code
+from nadeshiko.elf import write_object
+from nadeshiko.emitter import Emitter, DEFAULT_FLUSH_SIZE, DEFAULT_DEBUG_LEVEL
+from nadeshiko.fold import fold_constants
+from nadeshiko.inline import DEFAULT_INLINE_BUDGET, inline_functions
+from nadeshiko.licm import hoist_loop_invariants
+from nadeshiko.ir import format_function, lower_program
+from nadeshiko.ir_codegen import ir_codegen
+from nadeshiko.jit import libc, load, run_main
 from nadeshiko.parse import Parse
+from nadeshiko.peephole import PeepholeContext, PeepholeEmitter
+from nadeshiko.regalloc import SCRATCH_POOL, allocate_registers
 from nadeshiko.tokenize import tokenize
 
 
 @click.command()
 @click.argument("filename", type=click.File(), default="-")
-@click.option("-o", "--output", type=click.File("w"))
-def main(filename: TextIO, output: TextIO):
+@click.option("-o", "--output", type=click.File("w"), default="-")
+@click.option(
+    "-c", "compile_object", is_flag=True, help="write an ELF object instead of assembly"
+)
+@click.option(
+    "--run", is_flag=True, help="execute main in-process and exit with its result"
+)
+@click.option(
+    "--load",
+    "libraries",
+    type=click.Path(exists=True, dir_okay=False, resolve_path=True),
+    multiple=True,
+    help="shared library to resolve symbols against under --run",
+)
+@click.option("--flush-size", type=click.IntRange(min=1), default=DEFAULT_FLUSH_SIZE)
+@click.option(
+    "-g",
+    "debug_level",
+    type=click.IntRange(0, 2),
+    default=DEFAULT_DEBUG_LEVEL,
+    help="line info: 0 none, 1 lines, 2 lines and columns",
+)
+@click.option("-O", "optimize", is_flag=True, help="enable optimizations")
+@click.option("--stats", is_flag=True, help="report optimization statistics")
+@click.option("--no-peephole", is_flag=True, help="skip the peephole pass under -O")
+@click.option(
+    "--no-strength-reduction",
+    is_flag=True,
+    help="keep imul and idiv for constant operands under -O",
+)
+@click.option(
+    "--inline-budget",
+    type=click.IntRange(min=0),
+    default=DEFAULT_INLINE_BUDGET,
+    help="largest function, in AST nodes, inlined under -O (0 disables)",
+)
+@click.option("--no-dce", is_flag=True, help="skip dead code elimination under -O")
+@click.option(
+    "--no-licm", is_flag=True, help="skip loop-invariant code motion under -O"
+)
+@click.option("--emit-ir", is_flag=True, help="print the IR instead of assembly")
+def main(
+    filename: TextIO,
+    output: TextIO,
+    compile_object: bool,
+    run: bool,
+    libraries: tuple[str, ...],
+    flush_size: int,
+    debug_level: int,
+    optimize: bool,
+    stats: bool,
+    no_peephole: bool,
+    no_strength_reduction: bool,
+    inline_budget: int,
+    no_dce: bool,
+    no_licm: bool,
+    emit_ir: bool,
+):
+    started = time.perf_counter()
     expression = filename.read()
     assert len(expression) >= 0
     tokens = tokenize(expression)
     prog = Parse(tokens).parse_stmt()
-    result = codegen(filename.name, prog)
-
-    output.write(result)
+    if optimize:
+        folded = fold_constants(prog)
+        if stats:
+            click.echo(f"fold: {folded} nodes eliminated", err=True)
+        for call in inline_functions(prog, inline_budget):
+            if stats:
+                click.echo(
+                    f"inline: {call.callee} into {call.caller} "
+                    f"at line {call.line_number}",
+                    err=True,
+                )
+    if optimize and not no_dce:
+        eliminated = eliminate_dead_code(prog)
+        if stats:
+            for name, removed in eliminated.items():
+                click.echo(f"dce: {name} removed {removed} nodes", err=True)
+    if optimize and not no_licm:
+        hoisted = hoist_loop_invariants(prog)
+        if stats:
+            for name, count in hoisted.items():
+                click.echo(f"licm: {name} hoisted {count} expressions", err=True)
+    functions = lower_program(prog)
+    if emit_ir:
+        for function in functions:
+            output.write(format_function(function))
+        return
+    if optimize:
+        SCRATCH_REGISTERS.set(SCRATCH_POOL)
+        STRENGTH_REDUCTION.set(not no_strength_reduction)
+        allocate_registers(functions)
+    target = io.StringIO() if compile_object or run else output
+    if optimize and not no_peephole:
+        local_functions = frozenset(obj.name for obj in prog if obj.is_function)
+        emitter = PeepholeEmitter(
+            target, flush_size, debug_level, PeepholeContext(local_functions)
+        )
+    else:
+        emitter = Emitter(target, flush_size, debug_level)
+    ir_codegen(filename.name, prog, functions, emitter)
+    emitter.flush()
+    if compile_object:
+        output.buffer.write(write_object(assemble(target.getvalue())))
+    if stats and isinstance(emitter, PeepholeEmitter):
+        for name, removed in sorted(emitter.removed.items()):
+            click.echo(f"peephole: {name} removed {removed} instructions", err=True)
+    if run:
+        compiled = time.perf_counter()
+        program = load(
+            assemble(target.getvalue()),
+            [ctypes.CDLL(path) for path in libraries] + [libc()],
+        )
+        loaded = time.perf_counter()
+        result = run_main(program)
+        if stats:
+            click.echo(
+                f"run: compile {compiled - started:.6f}s, "
+                f"load {loaded - compiled:.6f}s, "
+                f"execute {time.perf_counter() - loaded:.6f}s",
+                err=True,
+            )
+        sys.exit(result & 0xFF)
 
 
 if __name__ == "__main__":
@@ -31,7 +31,7 @@ class NodeKind(IntEnum):
     Comma = 22
 
 
-@dataclass
+@dataclass(slots=True)
 class Node:
     kind: Optional[NodeKind] = None
     next_node: Optional["Node"] = None
@@ -48,22 +48,24 @@ class Node:
     token: Optional["Token"] = None
     node_type: Optional["Type"] = None
     function_name: Optional[str] = None
-    function_args: list[Optional["Node"]] = field(default_factory=list)
+    function_args: Optional[list["Node"]] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Obj:
     name: Optional[str] = None
     offset: Optional[int] = None
     object_type: Optional["Type"] = None
     body: Optional[Node] = None
-    locals_obj: list[Optional["Obj"]] = field(default_factory=list)
-    next_obj: list[Optional["Obj"]] = field(default_factory=list)
+    locals_obj: Optional[list["Obj"]] = None
+    next_obj: Optional[list["Obj"]] = None
     stack_size: Optional[int] = None
-    params: list[Optional["Obj"]] = field(default_factory=list)
+    params: Optional[list["Obj"]] = None
     is_local: bool = False
     is_function: bool = False
+    is_literal: bool = False
     init_data: str = ""
+    register: Optional[str] = None
 
 
 def new_node(kind: NodeKind, token: Token) -> Node:
@@ -98,7 +100,7 @@ def new_var_node(obj: Obj, token: Token) -> Node:
 
 
 def new_var(name: str, object_type: Optional["Type"], scope: Optional["Scope"]) -> Obj:
-    obj = Obj(name, 0, object_type, next_obj=[], is_local=False)
+    obj = Obj(name, 0, object_type, is_local=False)
     push_scope(name, obj, scope)
     return obj
 
@@ -131,21 +133,38 @@ def new_global_var(
 def add_type(node: Node) -> None:
     if not node or node.node_type:
         return
-    add_type(node.left)
-    add_type(node.right)
-    add_type(node.condition)
-    add_type(node.then)
-    add_type(node.els)
-    add_type(node.init)
-    add_type(node.inc)
-    current = node.body
-    while current:
-        add_type(current)
-        current = current.next_node
-    for arg in node.function_args:
-        add_type(arg)
+    stack = [node]
+    untyped = []
+    while stack:
+        node = stack.pop()
+        untyped.append(node)
+        for child in (
+            node.left,
+            node.right,
+            node.condition,
+            node.then,
+            node.els,
+            node.init,
+            node.inc,
+        ):
+            if child and not child.node_type:
+                stack.append(child)
+        current = node.body
+        while current:
+            if not current.node_type:
+                stack.append(current)
+            current = current.next_node
+        if node.function_args:
+            for arg in node.function_args:
+                if not arg.node_type:
+                    stack.append(arg)
+    for node in reversed(untyped):
+        add_node_type(node)
+
+
+def add_node_type(node: Node) -> None:
     match node.kind:
-        case (NodeKind.Add | NodeKind.Sub | NodeKind.Mul | NodeKind.Div | NodeKind.Neg):
+        case NodeKind.Add | NodeKind.Sub | NodeKind.Mul | NodeKind.Div | NodeKind.Neg:
             node.node_type = node.left.node_type
             return
         case NodeKind.Comma:
@@ -191,28 +210,42 @@ def add_type(node: Node) -> None:
             raise ValueError("stmt expr is not a valid expression")
 
 
-@dataclass
-class VarScope:
-    next_scope: Optional["VarScope"] = None
-    name: Optional[str] = None
-    var: Optional["Obj"] = None
+def count_nodes(prog: list[Obj]) -> int:
+    count = 0
+    stack = [obj.body for obj in prog if obj.body]
+    while stack:
+        node = stack.pop()
+        count += 1
+        for child in (
+            node.left,
+            node.right,
+            node.condition,
+            node.then,
+            node.els,
+            node.init,
+            node.inc,
+            node.body,
+            node.next_node,
+        ):
+            if isinstance(child, Node):
+                stack.append(child)
+        stack.extend(node.function_args or ())
+    return count
 
 
 @dataclass
 class Scope:
     next_scope: Optional["Scope"] = None
-    vars: Optional["VarScope"] = None
+    vars: dict[str, "Obj"] = field(default_factory=dict)
 
 
 def enter_scope(next_scope: Optional["Scope"]) -> Scope:
-    return Scope(next_scope, None)
+    return Scope(next_scope)
 
 
 def leave_scope(scope: Scope) -> Scope:
     return scope.next_scope
 
 
-def push_scope(name: str, var: Obj, scope: Scope) -> VarScope:
-    var_scope = VarScope(scope.vars, name, var)
-    scope.vars = var_scope
-    return var_scope
+def push_scope(name: str, var: Obj, scope: Scope) -> None:
+    scope.vars[name] = var
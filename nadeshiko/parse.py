@@ -1,5 +1,4 @@
-import copy
-from typing import Optional
+from typing import Optional, Iterable
 
 from nadeshiko.context import CURRENT_VAR_ID
 from nadeshiko.helper import error_message
@@ -19,7 +18,7 @@ from nadeshiko.node import (
     enter_scope,
     leave_scope,
 )
-from nadeshiko.token import TokenType, equal, skip, Token
+from nadeshiko.token import TokenType, TokenId, equal, skip, Token
 from nadeshiko.tokenize import consume
 from nadeshiko.type import (
     is_integer,
@@ -27,61 +26,91 @@ from nadeshiko.type import (
     pointer_to,
     Type,
     function_type,
-    copy_type,
     array_of,
     TypeKind,
     TYPE_CHAR,
 )
 from nadeshiko.utils import Peekable
 
+BINARY_PRECEDENCE = {
+    TokenId.Equal: 1,
+    TokenId.NotEqual: 1,
+    TokenId.Less: 2,
+    TokenId.Greater: 2,
+    TokenId.LessEqual: 2,
+    TokenId.GreaterEqual: 2,
+    TokenId.Plus: 3,
+    TokenId.Minus: 3,
+    TokenId.Star: 4,
+    TokenId.Slash: 4,
+}
+
+BINARY_NODE_KINDS = {
+    TokenId.Star: (NodeKind.Mul, False),
+    TokenId.Slash: (NodeKind.Div, False),
+    TokenId.Equal: (NodeKind.Equal, False),
+    TokenId.NotEqual: (NodeKind.NotEqual, False),
+    TokenId.Less: (NodeKind.Less, False),
+    TokenId.Greater: (NodeKind.Less, True),
+    TokenId.LessEqual: (NodeKind.LessEqual, False),
+    TokenId.GreaterEqual: (NodeKind.LessEqual, True),
+}
+
+UNARY_PREFIXES = frozenset({TokenId.Plus, TokenId.Minus, TokenId.Star})
+
+MAX_NESTING_DEPTH = 127
+
 
 class Parse:
     tokens: Peekable[Optional[Token]]
     local_objs: list[Optional["Obj"]]
     scope: Optional["Scope"] = None
 
-    def __init__(self, tokens: Peekable[Optional[Token]]) -> None:
-        self.tokens = tokens
+    def __init__(self, tokens: Iterable[Token]) -> None:
+        self.tokens = Peekable(tokens)
         self.local_objs = [None]
         self.global_objs: list[Obj] = []
-        self.scope = Scope()
+        self.string_pool: dict[str, Obj] = {}
+        self.global_scope = Scope()
+        self.scope = self.global_scope
+        self.depth = 0
 
     def function(self, basic_type: Type) -> Optional["Obj"]:
-        obj_type = self.declarator(basic_type)
-        function = new_global_var(obj_type.name, obj_type, self.global_objs, self.scope)
+        obj_type, name, param_names = self.declarator(basic_type)
+        function = new_global_var(name, obj_type, self.global_objs, self.scope)
         function.is_function = True
         self.local_objs = [None]
         self.scope = enter_scope(self.scope)
-        self.create_param_local_vars(obj_type.params)
+        self.create_param_local_vars(param_names, obj_type.params)
         self.local_objs.pop(0)
         function.params = self.local_objs.copy()
-        skip(next(self.tokens), "{")
+        skip(next(self.tokens), TokenId.LeftBrace)
         node = self.convert_compound_stmt()
         function.body = node
         function.stack_size = 0
         function.locals_obj = self.local_objs.copy()
-        function.name = obj_type.name
+        function.name = name
         self.scope = leave_scope(self.scope)
         return function
 
     def is_function(self) -> bool:
-        if equal(self.tokens.peek(), ";"):
+        if equal(self.tokens.peek(), TokenId.Semicolon):
             return False
-        tokens = copy.deepcopy(self.tokens)
+        self.tokens.mark()
         dummy_type = Type()
-        obj_type = self.declarator(dummy_type)
-        self.tokens = tokens
+        obj_type, _, _ = self.declarator(dummy_type)
+        self.tokens.rewind()
         return obj_type.kind == TypeKind.TYPE_FUNCTION
 
     def global_variable(self, basic_type: Type) -> list["Obj"]:
         first = True
         results = []
-        while not equal(self.tokens.peek(), ";"):
+        while not equal(self.tokens.peek(), TokenId.Semicolon):
             if not first:
-                skip(next(self.tokens), ",")
+                skip(next(self.tokens), TokenId.Comma)
             first = False
-            obj_type = self.declarator(basic_type)
-            new_global_var(obj_type.name, obj_type, results, self.scope)
+            obj_type, name, _ = self.declarator(basic_type)
+            new_global_var(name, obj_type, results, self.scope)
         next(self.tokens)
         self.global_objs.extend(results)
         return results
@@ -97,76 +126,95 @@ class Parse:
         objs.extend([item for item in self.global_objs if not item.is_function])
         return objs
 
+    def enter_nesting(self) -> None:
+        self.depth += 1
+        if self.depth > MAX_NESTING_DEPTH:
+            token = self.tokens.peek()
+            print(
+                error_message(
+                    token.original_expression, token.location, "nesting too deep"
+                )
+            )
+            exit(1)
+
     def parse_stmt_return(self) -> Optional[Node]:
+        self.enter_nesting()
+        node = self.statement()
+        self.depth -= 1
+        return node
+
+    def statement(self) -> Optional[Node]:
         token = self.tokens.peek()
-        if equal(token, "return"):
+        if equal(token, TokenId.Return):
             next(self.tokens)
             node = self.expression_parse()
             node = new_unary(NodeKind.Return, node, token)
-            skip(next(self.tokens), ";")
+            skip(next(self.tokens), TokenId.Semicolon)
             return node
-        if equal(token, "if"):
+        if equal(token, TokenId.If):
             node = new_node(NodeKind.If, token)
             next(self.tokens)
-            skip(next(self.tokens), "(")
+            skip(next(self.tokens), TokenId.LeftParen)
             node.condition = self.expression_parse()
-            skip(next(self.tokens), ")")
+            skip(next(self.tokens), TokenId.RightParen)
             node.then = self.parse_stmt_return()
-            if equal(self.tokens.peek(), "else"):
+            if equal(self.tokens.peek(), TokenId.Else):
                 next(self.tokens)
                 node.els = self.parse_stmt_return()
             return node
-        if equal(token, "while"):
+        if equal(token, TokenId.While):
             node = new_node(NodeKind.ForStmt, token)
             next(self.tokens)
-            skip(next(self.tokens), "(")
+            skip(next(self.tokens), TokenId.LeftParen)
             node.condition = self.expression_parse()
-            skip(next(self.tokens), ")")
+            skip(next(self.tokens), TokenId.RightParen)
             node.then = self.parse_stmt_return()
             return node
-        if equal(token, "for"):
+        if equal(token, TokenId.For):
             node = new_node(NodeKind.ForStmt, token)
             next(self.tokens)
-            skip(next(self.tokens), "(")
+            skip(next(self.tokens), TokenId.LeftParen)
             node.init = self.expression_parse_stmt()
-            if not equal(self.tokens.peek(), ";"):
+            if not equal(self.tokens.peek(), TokenId.Semicolon):
                 node.condition = self.expression_parse()
-            skip(next(self.tokens), ";")
-            if not equal(self.tokens.peek(), ")"):
+            skip(next(self.tokens), TokenId.Semicolon)
+            if not equal(self.tokens.peek(), TokenId.RightParen):
                 node.inc = self.expression_parse()
-            skip(next(self.tokens), ")")
+            skip(next(self.tokens), TokenId.RightParen)
             node.then = self.parse_stmt_return()
             return node
 
-        if equal(token, "{"):
+        if equal(token, TokenId.LeftBrace):
             next(self.tokens)
             return self.convert_compound_stmt()
         return self.expression_parse_stmt()
 
     def expression_parse_stmt(self) -> Optional[Node]:
         token = self.tokens.peek()
-        if equal(token, ";"):
+        if equal(token, TokenId.Semicolon):
             next(self.tokens)
             return new_node(NodeKind.Block, token)
         node = self.expression_parse()
         node = new_unary(NodeKind.ExpressionStmt, node, token)
-        skip(next(self.tokens), ";")
+        skip(next(self.tokens), TokenId.Semicolon)
         return node
 
     def expression_parse(self) -> Optional[Node]:
-        node = self.convert_assign_token()
-        if equal(self.tokens.peek(), ","):
+        nodes = [self.convert_assign_token()]
+        while equal(self.tokens.peek(), TokenId.Comma):
             next(self.tokens)
-            return new_binary(
-                NodeKind.Comma, node, self.expression_parse(), self.tokens.peek()
-            )
+            nodes.append(self.convert_assign_token())
+        node = nodes.pop()
+        token = self.tokens.peek()
+        while nodes:
+            node = new_binary(NodeKind.Comma, nodes.pop(), node, token)
         return node
 
     def convert_compound_stmt(self) -> Optional[Node]:
         head = new_node(NodeKind.Block, self.tokens.peek())
         current = head
         self.scope = enter_scope(self.scope)
-        while not equal(self.tokens.peek(), "}"):
+        while not equal(self.tokens.peek(), TokenId.RightBrace):
             if is_type_name(self.tokens.peek()):
                 node = self.declaration()
             else:
@@ -180,118 +228,78 @@ class Parse:
         next(self.tokens)
         return node
 
-    def convert_relational_token(self) -> Optional[Node]:
-        node = self.convert_add_token()
-        while True:
-            token = self.tokens.peek()
-            if equal(token, "<") or equal(token, ">"):
-                next(self.tokens)
-                next_node = self.convert_add_token()
-                left_node = node if equal(token, "<") else next_node
-                right_node = next_node if equal(token, "<") else node
-                node = new_binary(NodeKind.Less, left_node, right_node, token)
-                continue
-            if equal(token, "<=") or equal(token, ">="):
-                next(self.tokens)
-                next_node = self.convert_add_token()
-                left_node = node if equal(token, "<=") else next_node
-                right_node = next_node if equal(token, "<=") else node
-                node = new_binary(NodeKind.LessEqual, left_node, right_node, token)
-                continue
-            return node
-
     def convert_assign_token(self) -> Optional[Node]:
-        node = self.convert_equality_token()
-        if equal(self.tokens.peek(), "="):
-            token = next(self.tokens)
-            next_node = self.convert_assign_token()
-            node = new_binary(NodeKind.Assign, node, next_node, token)
+        nodes = [self.convert_binary_token()]
+        tokens = []
+        while equal(self.tokens.peek(), TokenId.Assign):
+            tokens.append(next(self.tokens))
+            nodes.append(self.convert_binary_token())
+        node = nodes.pop()
+        while tokens:
+            node = new_binary(NodeKind.Assign, nodes.pop(), node, tokens.pop())
         return node
 
-    def convert_equality_token(self) -> Optional[Node]:
-        node = self.convert_relational_token()
-        while True:
-            token = self.tokens.peek()
-            if equal(token, "=="):
-                next(self.tokens)
-                next_node = self.convert_relational_token()
-                node = new_binary(NodeKind.Equal, node, next_node, token)
-                continue
-            if equal(token, "!="):
-                next(self.tokens)
-                next_node = self.convert_relational_token()
-                node = new_binary(NodeKind.NotEqual, node, next_node, token)
-                continue
-            return node
-
-    def convert_add_token(self) -> Optional[Node]:
-        node = self.convert_mul_token()
-        while True:
-            token = self.tokens.peek()
-            if equal(token, "+"):
-                next(self.tokens)
-                next_node = self.convert_mul_token()
-                node = self.new_add(node, next_node, token)
-                continue
-            if equal(token, "-"):
-                next(self.tokens)
-                next_node = self.convert_mul_token()
-                node = self.new_sub(node, next_node, token)
-                continue
-            return node
+    def convert_binary_token(self) -> Optional[Node]:
+        nodes = [self.convert_unary_token()]
+        operators = []
+        while (
+            precedence := BINARY_PRECEDENCE.get(self.tokens.peek().token_id)
+        ) is not None:
+            while operators and operators[-1][0] >= precedence:
+                self.reduce_binary(nodes, operators.pop()[1])
+            operators.append((precedence, next(self.tokens)))
+            nodes.append(self.convert_unary_token())
+        while operators:
+            self.reduce_binary(nodes, operators.pop()[1])
+        return nodes[0]
+
+    def reduce_binary(self, nodes: list[Node], token: Token) -> None:
+        right = nodes.pop()
+        left = nodes.pop()
+        match token.token_id:
+            case TokenId.Plus:
+                nodes.append(self.new_add(left, right, token))
+            case TokenId.Minus:
+                nodes.append(self.new_sub(left, right, token))
+            case token_id:
+                kind, swapped = BINARY_NODE_KINDS[token_id]
+                if swapped:
+                    left, right = right, left
+                nodes.append(new_binary(kind, left, right, token))
 
     def convert_unary_token(self) -> Optional[Node]:
-        token = self.tokens.peek()
-        if equal(token, "+"):
-            next(self.tokens)
-            return self.convert_unary_token()
-        if equal(token, "-"):
-            next(self.tokens)
-            node = self.convert_unary_token()
-            node = new_unary(NodeKind.Neg, node, token)
-            return node
-        if equal(token, "&"):
-            next(self.tokens)
-            node = self.primary_token()
-            node = new_unary(NodeKind.Addr, node, token)
-            return node
-        if equal(token, "*"):
-            next(self.tokens)
-            node = self.convert_unary_token()
-            node = new_unary(NodeKind.Deref, node, token)
-            return node
-        return self.postfix()
-
-    def convert_mul_token(self) -> Optional[Node]:
-        node = self.convert_unary_token()
-        while True:
-            token = self.tokens.peek()
-            if equal(token, "*"):
-                next(self.tokens)
-                next_node = self.primary_token()
-                node = new_binary(NodeKind.Mul, node, next_node, token)
-                continue
-            if equal(token, "/"):
-                next(self.tokens)
-                next_node = self.primary_token()
-                node = new_binary(NodeKind.Div, node, next_node, token)
-                continue
-            return node
+        tokens = []
+        while self.tokens.peek().token_id in UNARY_PREFIXES:
+            tokens.append(next(self.tokens))
+        self.enter_nesting()
+        if equal(self.tokens.peek(), TokenId.Ampersand):
+            token = next(self.tokens)
+            node = new_unary(NodeKind.Addr, self.primary_token(), token)
+        else:
+            node = self.postfix()
+        self.depth -= 1
+        while tokens:
+            token = tokens.pop()
+            if equal(token, TokenId.Minus):
+                node = new_unary(NodeKind.Neg, node, token)
+            elif equal(token, TokenId.Star):
+                node = new_unary(NodeKind.Deref, node, token)
+        return node
 
     def primary_token(self) -> Optional[Node]:
         token = self.tokens.peek()
-        if equal(token, "("):
+        if equal(token, TokenId.LeftParen):
             next(self.tokens)
-            if equal(self.tokens.peek(), "{"):
+            if equal(self.tokens.peek(), TokenId.LeftBrace):
                 next(self.tokens)
                 node = new_node(NodeKind.StmtExpression, self.tokens.peek())
                 node.body = self.convert_compound_stmt().body
-                skip(next(self.tokens), ")")
+                skip(next(self.tokens), TokenId.RightParen)
                 return node
             next_node = self.expression_parse()
-            skip(next(self.tokens), ")")
+            skip(next(self.tokens), TokenId.RightParen)
             return next_node
-        if equal(token, "sizeof"):
+        if equal(token, TokenId.Sizeof):
             next(self.tokens)
             token = self.tokens.peek()
             node = self.convert_unary_token()
@@ -302,35 +310,43 @@ class Parse:
             return new_number(token.value, token)
         if token.kind == TokenType.STRING:
             var = new_string_literal(
-                token.str_value, token.str_type, self.global_objs, self.scope
+                token.str_value,
+                token.str_type,
+                self.global_objs,
+                self.global_scope,
+                self.string_pool,
             )
             next(self.tokens)
             return new_var_node(var, token)
         if token.kind == TokenType.Identifier:
             last_token = next(self.tokens)
-            if equal(self.tokens.peek(), "("):
+            if equal(self.tokens.peek(), TokenId.LeftParen):
                 return self.function_call(last_token)
-            obj = search_obj(token.expression, self.scope)
+            obj = search_obj(token.expression, self.scope, self.global_scope)
             if not obj:
                 print(
                     error_message(
-                        token.expression, token.location, "undefined variable"
+                        token.original_expression, token.location, "undefined variable"
                     )
                 )
                 exit(1)
             return new_var_node(obj, token)
-        print(error_message(token.expression, token.location, "expected an expression"))
+        print(
+            error_message(
+                token.original_expression, token.location, "expected an expression"
+            )
+        )
         exit(1)
 
     def function_call(self, function_token: Token) -> Optional["Node"]:
         token = function_token
-        skip(next(self.tokens), "(")
+        skip(next(self.tokens), TokenId.LeftParen)
         nodes = []
-        while not equal(self.tokens.peek(), ")"):
+        while not equal(self.tokens.peek(), TokenId.RightParen):
             if nodes:
-                skip(next(self.tokens), ",")
+                skip(next(self.tokens), TokenId.Comma)
             nodes.append(self.convert_assign_token())
-        skip(next(self.tokens), ")")
+        skip(next(self.tokens), TokenId.RightParen)
         node = new_node(NodeKind.FunctionCall, token)
         node.function_name = token.expression
         node.function_args = nodes
@@ -392,17 +408,17 @@ class Parse:
 
     def declaration_spec(self) -> Optional["Type"]:
         token = self.tokens.peek()
-        if equal(token, "char"):
+        if equal(token, TokenId.Char):
             next(self.tokens)
             return TYPE_CHAR
-        if equal(token, "int"):
+        if equal(token, TokenId.Int):
             next(self.tokens)
             return TYPE_INT
-        print(error_message(token.expression, token.location, "expected type"))
+        print(error_message(token.original_expression, token.location, "expected type"))
         exit(1)
 
-    def declarator(self, obj_type: Optional["Type"]) -> Optional["Type"]:
-        while consume(self.tokens, "*"):
+    def declarator(self, obj_type: Optional["Type"]) -> tuple[Type, str, list[str]]:
+        while consume(self.tokens, TokenId.Star):
             obj_type = pointer_to(obj_type)
         if self.tokens.peek().kind != TokenType.Identifier:
             print(
@@ -414,22 +430,21 @@ class Parse:
             )
             exit(1)
         last_token = next(self.tokens)
-        obj_type = self.type_suffix(obj_type)
-        obj_type.name = last_token.expression
-        return obj_type
+        obj_type, param_names = self.type_suffix(obj_type)
+        return obj_type, last_token.expression, param_names
 
     def declaration(self) -> Optional["Node"]:
         base_type = self.declaration_spec()
         head = Node(NodeKind.Block)
         current = head
         i = 0
-        while not equal(self.tokens.peek(), ";"):
+        while not equal(self.tokens.peek(), TokenId.Semicolon):
             i += 1
             if i > 1:
-                skip(next(self.tokens), ",")
-            obj_type = self.declarator(base_type)
-            obj = new_local_var(obj_type.name, obj_type, self.local_objs, self.scope)
-            if not equal(self.tokens.peek(), "="):
+                skip(next(self.tokens), TokenId.Comma)
+            obj_type, name, _ = self.declarator(base_type)
+            obj = new_local_var(name, obj_type, self.local_objs, self.scope)
+            if not equal(self.tokens.peek(), TokenId.Assign):
                 continue
             left_node = new_var_node(obj, self.tokens.peek())
             next(self.tokens)
@@ -447,45 +462,44 @@ class Parse:
         next(self.tokens)
         return node
 
-    def func_params(self, node_type: Optional["Type"]) -> Type:
-        type_objs = []
-        while not equal(self.tokens.peek(), ")"):
-            if type_objs:
-                skip(next(self.tokens), ",")
+    def func_params(self, node_type: Optional["Type"]) -> tuple[Type, list[str]]:
+        param_types = []
+        param_names = []
+        while not equal(self.tokens.peek(), TokenId.RightParen):
+            if param_types:
+                skip(next(self.tokens), TokenId.Comma)
             base_type = self.declaration_spec()
-            obj_type = self.declarator(base_type)
-            type_objs.append(copy_type(obj_type))
-        func_type = function_type(node_type)
-        func_type.params = type_objs
-        skip(next(self.tokens), ")")
-        return func_type
-
-    def type_suffix(self, node_type: Optional["Type"]) -> Type:
-        if equal(self.tokens.peek(), "("):
+            obj_type, name, _ = self.declarator(base_type)
+            param_types.append(obj_type)
+            param_names.append(name)
+        skip(next(self.tokens), TokenId.RightParen)
+        return function_type(node_type, tuple(param_types)), param_names
+
+    def type_suffix(self, node_type: Optional["Type"]) -> tuple[Type, list[str]]:
+        if equal(self.tokens.peek(), TokenId.LeftParen):
             next(self.tokens)
             return self.func_params(node_type)
-        if equal(self.tokens.peek(), "["):
+        if equal(self.tokens.peek(), TokenId.LeftBracket):
             next(self.tokens)
             size = get_number(next(self.tokens))
-            skip(next(self.tokens), "]")
-            node_type = self.type_suffix(node_type)
-            return array_of(node_type, size)
-        return node_type
-
-    def create_param_local_vars(self, params: list[Optional["Type"]]) -> None:
-        if not params:
-            return
-        for temp_param in params:
-            self.create_param_local_vars(temp_param.params)
-            new_local_var(temp_param.name, temp_param, self.local_objs, self.scope)
+            skip(next(self.tokens), TokenId.RightBracket)
+            node_type, _ = self.type_suffix(node_type)
+            return array_of(node_type, size), []
+        return node_type, []
+
+    def create_param_local_vars(
+        self, param_names: list[str], params: tuple[Type, ...]
+    ) -> None:
+        for name, param in zip(param_names, params):
+            new_local_var(name, param, self.local_objs, self.scope)
 
     def postfix(self) -> Optional["Node"]:
         node = self.primary_token()
-        while equal(self.tokens.peek(), "["):
+        while equal(self.tokens.peek(), TokenId.LeftBracket):
             next(self.tokens)
             token = self.tokens.peek()
             index_node = self.expression_parse()
-            skip(next(self.tokens), "]")
+            skip(next(self.tokens), TokenId.RightBracket)
             node = new_unary(
                 NodeKind.Deref,
                 self.new_add(node, index_node, token),
@@ -494,15 +508,14 @@ class Parse:
         return node
 
 
-def search_obj(obj: str, scope: Optional["Scope"]) -> Optional[Obj]:
-    while scope:
-        var_scope = scope.vars
-        while var_scope:
-            if var_scope.name == obj:
-                return var_scope.var
-            var_scope = var_scope.next_scope
+def search_obj(
+    obj: str, scope: Optional["Scope"], global_scope: "Scope"
+) -> Optional[Obj]:
+    while scope is not global_scope:
+        if (var := scope.vars.get(obj)) is not None:
+            return var
         scope = scope.next_scope
-    return None
+    return global_scope.vars.get(obj)
 
 
 def get_number(token: Token) -> int:
@@ -515,7 +528,7 @@ def get_number(token: Token) -> int:
 
 
 def is_type_name(token: Token) -> bool:
-    return equal(token, "int") or equal(token, "char")
+    return equal(token, TokenId.Int) or equal(token, TokenId.Char)
 
 
 def net_unique_name() -> str:
@@ -536,7 +549,12 @@ def new_string_literal(
     node_type: Type,
     global_objs: list["Obj"],
     scope: Optional["Scope"],
+    string_pool: dict[str, "Obj"],
 ) -> Obj:
+    if var := string_pool.get(string_value):
+        return var
     var = new_anon_gvar(node_type, global_objs, scope)
     var.init_data = string_value
+    var.is_literal = True
+    string_pool[string_value] = var
     return var
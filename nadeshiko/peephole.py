@@ -0,0 +1,269 @@
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable, Optional, TextIO
+
+from nadeshiko.emitter import (
+    Emitter,
+    DEFAULT_FLUSH_SIZE,
+    DEFAULT_DEBUG_LEVEL,
+    is_instruction,
+)
+
+MAX_WINDOW = 8
+
+REGISTER_ALIASES = {
+    "rax": ("rax", "eax", "ax", "al"),
+    "rdi": ("rdi", "edi", "di", "dil"),
+    "rsi": ("rsi", "esi", "si", "sil"),
+    "rdx": ("rdx", "edx", "dx", "dl"),
+    "rcx": ("rcx", "ecx", "cx", "cl"),
+    "r8": ("r8", "r8d", "r8w", "r8b"),
+    "r9": ("r9", "r9d", "r9w", "r9b"),
+}
+
+INVERTED_JUMPS = {
+    "sete": "jne",
+    "setne": "je",
+    "setl": "jge",
+    "setle": "jg",
+}
+
+CONTROL_INSTRUCTIONS = ("push", "pop", "call", "ret", "cqo", "idiv")
+
+
+@dataclass(slots=True)
+class PeepholeContext:
+    local_functions: frozenset[str] = frozenset()
+
+
+PeepholeRewrite = Callable[
+    [list[str], PeepholeContext], Optional[tuple[int, list[str]]]
+]
+
+
+@dataclass(slots=True)
+class PeepholeRule:
+    name: str
+    window: int
+    rewrite: PeepholeRewrite
+
+
+PEEPHOLE_RULES: list[PeepholeRule] = []
+
+
+def peephole_rule(
+    name: str, window: int
+) -> Callable[[PeepholeRewrite], PeepholeRewrite]:
+    def register(rewrite: PeepholeRewrite) -> PeepholeRewrite:
+        PEEPHOLE_RULES.append(PeepholeRule(name, window, rewrite))
+        return rewrite
+
+    return register
+
+
+def is_transparent(line: str) -> bool:
+    return line.startswith("  .loc")
+
+
+def is_label(line: str) -> bool:
+    return line.endswith(":")
+
+
+def opcode(line: str) -> str:
+    return line.split(None, 1)[0]
+
+
+def mentions(line: str, register: str) -> bool:
+    names = REGISTER_ALIASES.get(register, (register,))
+    return re.search(rf"%(?:{'|'.join(names)})\b", line) is not None
+
+
+@peephole_rule("push-pop", 4)
+def push_pop(
+    window: list[str], context: PeepholeContext
+) -> Optional[tuple[int, list[str]]]:
+    match = re.fullmatch(r"  pop %(\w+)", window[-1])
+    if not match:
+        return None
+    register = match.group(1)
+    for start in range(len(window) - 2, -1, -1):
+        if window[start] == "  push %rax":
+            break
+        line = window[start]
+        if (
+            not is_instruction(line)
+            or opcode(line) in CONTROL_INSTRUCTIONS
+            or opcode(line).startswith("j")
+            or (opcode(line) == "imul" and "," not in line)
+            or mentions(line, register)
+            or mentions(line, "rsp")
+        ):
+            return None
+    else:
+        return None
+    middle = window[start + 1 : -1]
+    if register == "rax":
+        if middle:
+            return None
+        return 2, []
+    return len(window) - start, [f"  mov %rax, %{register}", *middle]
+
+
+@peephole_rule("zero-before-call", 2)
+def zero_before_call(
+    window: list[str], context: PeepholeContext
+) -> Optional[tuple[int, list[str]]]:
+    if len(window) < 2 or window[-2] != "  mov $0, %rax":
+        return None
+    match = re.fullmatch(r"  call (\w+)", window[-1])
+    if not match or match.group(1) not in context.local_functions:
+        return None
+    return 2, [window[-1]]
+
+
+@peephole_rule("setcc-branch", 4)
+def setcc_branch(
+    window: list[str], context: PeepholeContext
+) -> Optional[tuple[int, list[str]]]:
+    if len(window) < 4:
+        return None
+    setcc, extend, compare, jump = window
+    if (
+        extend != "  movzb %al, %rax"
+        or compare != "  cmp $0, %rax"
+        or not jump.startswith("  je ")
+    ):
+        return None
+    match = re.fullmatch(r"  (set\w+) %al", setcc)
+    if not match or match.group(1) not in INVERTED_JUMPS:
+        return None
+    return 4, [f"  {INVERTED_JUMPS[match.group(1)]} {jump.split()[1]}"]
+
+
+@peephole_rule("store-load", 2)
+def store_load(
+    window: list[str], context: PeepholeContext
+) -> Optional[tuple[int, list[str]]]:
+    if len(window) < 2:
+        return None
+    store = re.fullmatch(r"  mov %rax, (\S+)", window[-2])
+    if not store or mentions(store.group(1), "rax"):
+        return None
+    if window[-1] != f"  mov {store.group(1)}, %rax":
+        return None
+    return 2, [window[-2]]
+
+
+@peephole_rule("immediate-operand", 2)
+def immediate_operand(
+    window: list[str], context: PeepholeContext
+) -> Optional[tuple[int, list[str]]]:
+    if len(window) < 2:
+        return None
+    load = re.fullmatch(r"  mov \$(-?\d+), %rdi", window[-2])
+    operation = re.fullmatch(r"  (add|sub|imul|cmp) %rdi, %rax", window[-1])
+    if not load or not operation or not -(1 << 31) <= int(load.group(1)) < 1 << 31:
+        return None
+    return 2, [f"  {operation.group(1)} ${load.group(1)}, %rax"]
+
+
+@peephole_rule("jump-to-next", 2)
+def jump_to_next(
+    window: list[str], context: PeepholeContext
+) -> Optional[tuple[int, list[str]]]:
+    if len(window) < 2 or not window[-2].startswith("  jmp "):
+        return None
+    if window[-2].split()[1] + ":" != window[-1]:
+        return None
+    return 2, [window[-1]]
+
+
+@peephole_rule("unreachable", 2)
+def unreachable(
+    window: list[str], context: PeepholeContext
+) -> Optional[tuple[int, list[str]]]:
+    if len(window) < 2 or not window[-2].startswith("  jmp "):
+        return None
+    if not is_instruction(window[-1]):
+        return None
+    return 2, [window[-2]]
+
+
+class PeepholeEmitter(Emitter):
+    def __init__(
+        self,
+        output: TextIO,
+        flush_size: int = DEFAULT_FLUSH_SIZE,
+        debug_level: int = DEFAULT_DEBUG_LEVEL,
+        context: Optional[PeepholeContext] = None,
+        rules: Optional[list[PeepholeRule]] = None,
+    ) -> None:
+        super().__init__(output, flush_size, debug_level)
+        self.context = context or PeepholeContext()
+        self.rules = PEEPHOLE_RULES if rules is None else rules
+        self.pending: list[str] = []
+        self.removed: Counter[str] = Counter()
+
+    def put(self, line: str) -> None:
+        self.pending.append(line)
+        if is_transparent(line):
+            return
+        self.optimize()
+        positions = [
+            i for i, line in enumerate(self.pending) if not is_transparent(line)
+        ]
+        if len(positions) > MAX_WINDOW:
+            retired = positions[-MAX_WINDOW]
+            for line in self.pending[:retired]:
+                super().put(line)
+            del self.pending[:retired]
+
+    def optimize(self) -> None:
+        changed = True
+        while changed:
+            changed = False
+            positions = [
+                i for i, line in enumerate(self.pending) if not is_transparent(line)
+            ]
+            for rule in self.rules:
+                window = trim_window(
+                    [self.pending[i] for i in positions[-rule.window :]]
+                )
+                if not window:
+                    continue
+                result = rule.rewrite(window, self.context)
+                if result is None:
+                    continue
+                count, replacement = result
+                prefix = 0
+                while (
+                    prefix < min(count, len(replacement))
+                    and window[-count + prefix] == replacement[prefix]
+                ):
+                    prefix += 1
+                replacement = replacement[prefix:]
+                count -= prefix
+                first = positions[-count]
+                kept = [line for line in self.pending[first:] if is_transparent(line)]
+                self.pending[first:] = kept + replacement
+                self.removed[rule.name] += count - len(replacement)
+                changed = True
+                break
+
+    def flush(self) -> None:
+        for line in self.pending:
+            super().put(line)
+        self.pending.clear()
+        super().flush()
+
+
+def is_instruction_or_label(line: str) -> bool:
+    return is_instruction(line) or is_label(line)
+
+
+def trim_window(window: list[str]) -> list[str]:
+    for i in range(len(window) - 1, -1, -1):
+        if not is_instruction_or_label(window[i]):
+            return window[i + 1 :]
+    return window
@@ -0,0 +1,241 @@
+from collections import Counter
+from dataclasses import dataclass
+from typing import Optional
+
+from nadeshiko.context import SCRATCH_REGISTERS
+from nadeshiko.ir import IRFunction, Instruction, Opcode
+from nadeshiko.node import Obj
+from nadeshiko.strength import fits_int32
+from nadeshiko.type import TypeKind
+
+CALLEE_SAVED_REGISTERS = ["rbx", "r12", "r13", "r14", "r15"]
+SCRATCH_POOL = ("r10", "r11", "r8", "r9", "rsi")
+ADDRESS_OPCODES = frozenset({Opcode.LocalAddress, Opcode.GlobalAddress})
+MEMORY_OPCODES = frozenset({Opcode.Load, Opcode.Store})
+
+
+@dataclass(slots=True)
+class LiveInterval:
+    value: int
+    start: int
+    end: int
+    crosses_call: bool = False
+
+
+def is_folded(instruction: Instruction) -> bool:
+    if instruction.opcode == Opcode.Const:
+        return fits_int32(instruction.value)
+    return instruction.opcode in ADDRESS_OPCODES
+
+
+def is_register_candidate(var: Obj) -> bool:
+    return var.is_local and var.object_type.kind != TypeKind.TYPE_ARRAY
+
+
+class Liveness:
+    def __init__(self, function: IRFunction) -> None:
+        self.function = function
+        self.definitions = {
+            instruction.dest: instruction
+            for block in function.blocks
+            for instruction in block.instructions
+            if instruction.dest is not None
+        }
+        self.values: dict[int, int] = {}
+        self.variables: dict[int, Obj] = {}
+        self.intervals: dict[int, LiveInterval] = {}
+        self.calls: list[int] = []
+        self.aliases: dict[int, int] = {}
+        self.address_taken = any(
+            self.escapes(instruction, index, arg)
+            for block in function.blocks
+            for instruction in block.instructions
+            for index, arg in enumerate(instruction.args)
+        )
+
+    def escapes(self, instruction: Instruction, index: int, arg: int) -> bool:
+        definition = self.definitions[arg]
+        if definition.opcode != Opcode.LocalAddress:
+            return False
+        if instruction.opcode in MEMORY_OPCODES and index == 0:
+            return False
+        return is_register_candidate(definition.var)
+
+    def variable(self, address: int) -> Optional[int]:
+        definition = self.definitions[address]
+        if definition.opcode != Opcode.LocalAddress or self.address_taken:
+            return None
+        return self.variable_value(definition.var)
+
+    def variable_value(self, var: Obj) -> Optional[int]:
+        if not is_register_candidate(var):
+            return None
+        if (value := self.values.get(id(var))) is None:
+            value = self.function.vreg_count + len(self.values) + 1
+            self.values[id(var)] = value
+            self.variables[value] = var
+        return value
+
+    def forward_loads(self) -> None:
+        counts = Counter(
+            arg
+            for block in self.function.blocks
+            for instruction in block.instructions
+            for arg in instruction.args
+        )
+        for block in self.function.blocks:
+            pending: dict[int, tuple[int, int]] = {}
+            stores: Counter[int] = Counter()
+            for instruction in block.instructions:
+                for arg in instruction.args:
+                    if arg in pending:
+                        var, generation = pending.pop(arg)
+                        if stores[var] == generation:
+                            self.aliases[arg] = var
+                if instruction.opcode not in MEMORY_OPCODES:
+                    continue
+                if (var := self.variable(instruction.args[0])) is None:
+                    continue
+                if instruction.opcode == Opcode.Store:
+                    stores[var] += 1
+                elif counts[instruction.dest] == 1:
+                    pending[instruction.dest] = (var, stores[var])
+
+    def operands(self, instruction: Instruction) -> tuple[list[int], list[int]]:
+        args = instruction.args
+        if instruction.opcode in MEMORY_OPCODES and (
+            (var := self.variable(args[0])) is not None
+        ):
+            if instruction.opcode == Opcode.Load:
+                if instruction.dest in self.aliases:
+                    return [], []
+                return [var], [instruction.dest]
+            uses, defs = [args[1]], [var]
+        else:
+            uses = list(args)
+            defs = [] if instruction.dest is None else [instruction.dest]
+        uses = [
+            self.aliases.get(value, value)
+            for value in uses
+            if not is_folded(self.definitions[value])
+        ]
+        defs = [
+            value
+            for value in defs
+            if value not in self.definitions or not is_folded(self.definitions[value])
+        ]
+        return uses, defs
+
+    def occur(self, value: int, position: int) -> None:
+        if (interval := self.intervals.get(value)) is None:
+            self.intervals[value] = LiveInterval(value, position, position)
+        else:
+            interval.start = min(interval.start, position)
+            interval.end = max(interval.end, position)
+
+    def analyze(self) -> None:
+        self.forward_loads()
+        if not self.address_taken:
+            for param in self.function.obj.params:
+                if (value := self.variable_value(param)) is not None:
+                    self.occur(value, 0)
+        blocks = self.function.blocks
+        ranges: dict[int, tuple[int, int]] = {}
+        uses: dict[int, set[int]] = {}
+        defs: dict[int, set[int]] = {}
+        position = 0
+        for block in blocks:
+            first = position + 2
+            uses[block.id], defs[block.id] = set(), set()
+            for instruction in block.instructions:
+                position += 2
+                used, defined = self.operands(instruction)
+                for value in used:
+                    self.occur(value, position)
+                    if value not in defs[block.id]:
+                        uses[block.id].add(value)
+                for value in defined:
+                    self.occur(value, position)
+                    defs[block.id].add(value)
+                if instruction.opcode == Opcode.Call:
+                    self.calls.append(position)
+            ranges[block.id] = (first, position)
+        live_in: dict[int, set[int]] = {block.id: set() for block in blocks}
+        live_out: dict[int, set[int]] = {block.id: set() for block in blocks}
+        changed = True
+        while changed:
+            changed = False
+            for block in reversed(blocks):
+                out = set().union(*(live_in[target] for target in block.successors))
+                incoming = uses[block.id] | (out - defs[block.id])
+                if out != live_out[block.id] or incoming != live_in[block.id]:
+                    live_out[block.id], live_in[block.id] = out, incoming
+                    changed = True
+        for block in blocks:
+            first, last = ranges[block.id]
+            for value in live_in[block.id]:
+                self.occur(value, first - 1)
+            for value in live_out[block.id]:
+                self.occur(value, last + 1)
+        for interval in self.intervals.values():
+            interval.crosses_call = any(
+                interval.start < call < interval.end for call in self.calls
+            )
+
+
+def linear_scan(
+    intervals: list[LiveInterval], scratch: tuple[str, ...]
+) -> dict[int, str]:
+    registers: dict[int, str] = {}
+    active: list[LiveInterval] = []
+    saved = CALLEE_SAVED_REGISTERS[::-1]
+    free = list(scratch[::-1])
+    for interval in sorted(intervals, key=lambda item: item.start):
+        for expired in [item for item in active if item.end < interval.start]:
+            active.remove(expired)
+            register = registers[expired.value]
+            (saved if register in CALLEE_SAVED_REGISTERS else free).append(register)
+        pool = saved if interval.crosses_call or not free else free
+        if pool:
+            registers[interval.value] = pool.pop()
+            active.append(interval)
+            continue
+        candidates = [
+            item
+            for item in active
+            if not interval.crosses_call
+            or registers[item.value] in CALLEE_SAVED_REGISTERS
+        ]
+        if not candidates:
+            continue
+        spill = max(candidates, key=lambda item: item.end)
+        if spill.end > interval.end:
+            registers[interval.value] = registers.pop(spill.value)
+            active.remove(spill)
+            active.append(interval)
+    return registers
+
+
+def allocate_function_registers(function: IRFunction) -> None:
+    liveness = Liveness(function)
+    liveness.analyze()
+    registers = linear_scan(list(liveness.intervals.values()), SCRATCH_REGISTERS.get())
+    for vreg, value in liveness.aliases.items():
+        function.aliases[vreg] = liveness.variables[value]
+    for value, register in registers.items():
+        if (var := liveness.variables.get(value)) is not None:
+            var.register = register
+        else:
+            function.registers[value] = register
+
+
+def allocate_registers(functions: list[IRFunction]) -> None:
+    for function in functions:
+        allocate_function_registers(function)
+
+
+def used_registers(function: IRFunction) -> list[str]:
+    registers = set(function.registers.values()) | {
+        obj.register for obj in function.obj.locals_obj if obj.register
+    }
+    return [register for register in CALLEE_SAVED_REGISTERS if register in registers]
@@ -0,0 +1,89 @@
+from typing import Optional
+
+from nadeshiko.helper import wrap_int64
+
+LEA_FACTORS = {3: 2, 5: 4, 9: 8}
+UINT64_MASK = (1 << 64) - 1
+
+
+def fits_int32(value: int) -> bool:
+    return -(1 << 31) <= value < 1 << 31
+
+
+def signed_magic(divisor: int) -> tuple[int, int]:
+    two63 = 1 << 63
+    magnitude = abs(divisor)
+    t = two63 + ((divisor & UINT64_MASK) >> 63)
+    anc = t - 1 - t % magnitude
+    p = 63
+    q1, r1 = divmod(two63, anc)
+    q2, r2 = divmod(two63, magnitude)
+    while True:
+        p += 1
+        q1, r1 = 2 * q1, 2 * r1
+        if r1 >= anc:
+            q1, r1 = q1 + 1, r1 - anc
+        q2, r2 = 2 * q2, 2 * r2
+        if r2 >= magnitude:
+            q2, r2 = q2 + 1, r2 - magnitude
+        delta = magnitude - r2
+        if not (q1 < delta or (q1 == delta and r1 == 0)):
+            break
+    magic = wrap_int64(q2 + 1)
+    if divisor < 0:
+        magic = wrap_int64(-magic)
+    return magic, p - 64
+
+
+def multiply_by_constant(value: int) -> Optional[list[str]]:
+    if value == 0:
+        return ["  mov $0, %rax"]
+    magnitude = abs(value)
+    shift = (magnitude & -magnitude).bit_length() - 1
+    odd = magnitude >> shift
+    if odd == 1:
+        results = []
+    elif odd in LEA_FACTORS:
+        results = [f"  lea (%rax,%rax,{LEA_FACTORS[odd]}), %rax"]
+    elif fits_int32(value):
+        return [f"  imul ${value}, %rax"]
+    else:
+        return None
+    if shift:
+        results.append(f"  shl ${shift}, %rax")
+    if value < 0:
+        results.append("  neg %rax")
+    return results
+
+
+def divide_by_constant(value: int) -> Optional[list[str]]:
+    if value == 0:
+        return None
+    if value == 1:
+        return []
+    if value == -1:
+        return ["  neg %rax"]
+    magnitude = abs(value)
+    if magnitude & (magnitude - 1) == 0:
+        shift = magnitude.bit_length() - 1
+        results = [
+            "  mov %rax, %rdi",
+            "  sar $63, %rdi",
+            f"  shr ${64 - shift}, %rdi",
+            "  add %rdi, %rax",
+            f"  sar ${shift}, %rax",
+        ]
+    else:
+        magic, shift = signed_magic(value)
+        results = ["  mov %rax, %rdi", f"  mov ${magic}, %rax", "  imul %rdi"]
+        if value > 0 and magic < 0:
+            results.append("  add %rdi, %rdx")
+        if value < 0 and magic > 0:
+            results.append("  sub %rdi, %rdx")
+        if shift:
+            results.append(f"  sar ${shift}, %rdx")
+        results.extend(["  mov %rdx, %rax", "  shr $63, %rax", "  add %rdx, %rax"])
+        return results
+    if value < 0:
+        results.append("  neg %rax")
+    return results
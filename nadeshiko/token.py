@@ -1,8 +1,8 @@
-from dataclasses import dataclass
+from array import array
 from enum import IntEnum
 from typing import Optional
 
-from nadeshiko.helper import error_message
+from nadeshiko.helper import error_message, line_index
 from nadeshiko.type import Type
 
 
@@ -15,23 +15,183 @@ class TokenType(IntEnum):
     STRING = 6
 
 
-@dataclass
+class TokenId(IntEnum):
+    Other = 0
+    Plus = 1
+    Minus = 2
+    Star = 3
+    Slash = 4
+    Equal = 5
+    NotEqual = 6
+    Less = 7
+    LessEqual = 8
+    Greater = 9
+    GreaterEqual = 10
+    Assign = 11
+    Ampersand = 12
+    Comma = 13
+    Semicolon = 14
+    LeftParen = 15
+    RightParen = 16
+    LeftBrace = 17
+    RightBrace = 18
+    LeftBracket = 19
+    RightBracket = 20
+    Return = 21
+    If = 22
+    Else = 23
+    While = 24
+    For = 25
+    Int = 26
+    Sizeof = 27
+    Char = 28
+
+
+PUNCTUATOR_IDS = {
+    "+": TokenId.Plus,
+    "-": TokenId.Minus,
+    "*": TokenId.Star,
+    "/": TokenId.Slash,
+    "==": TokenId.Equal,
+    "!=": TokenId.NotEqual,
+    "<": TokenId.Less,
+    "<=": TokenId.LessEqual,
+    ">": TokenId.Greater,
+    ">=": TokenId.GreaterEqual,
+    "=": TokenId.Assign,
+    "&": TokenId.Ampersand,
+    ",": TokenId.Comma,
+    ";": TokenId.Semicolon,
+    "(": TokenId.LeftParen,
+    ")": TokenId.RightParen,
+    "{": TokenId.LeftBrace,
+    "}": TokenId.RightBrace,
+    "[": TokenId.LeftBracket,
+    "]": TokenId.RightBracket,
+}
+
+KEYWORD_IDS = {
+    "return": TokenId.Return,
+    "if": TokenId.If,
+    "else": TokenId.Else,
+    "while": TokenId.While,
+    "for": TokenId.For,
+    "int": TokenId.Int,
+    "sizeof": TokenId.Sizeof,
+    "char": TokenId.Char,
+}
+
+FIXED_NAMES = (*PUNCTUATOR_IDS, *KEYWORD_IDS)
+FIXED_NAME_INDEXES = {name: index for index, name in enumerate(FIXED_NAMES)}
+
+
+TOKEN_CHUNK_SIZE = 1024
+
+
+class TokenSource:
+    def __init__(self, expression: str) -> None:
+        self.expression = expression
+        self.line_index = line_index(expression)
+        self.names = list(FIXED_NAMES)
+        self.name_indexes = dict(FIXED_NAME_INDEXES)
+        self.strings: list[tuple[str, Type]] = []
+
+    def intern_name(self, name: str) -> int:
+        if (index := self.name_indexes.get(name)) is None:
+            index = len(self.names)
+            self.names.append(name)
+            self.name_indexes[name] = index
+        return index
+
+    def add_string(self, str_value: str, str_type: Type) -> int:
+        self.strings.append((str_value, str_type))
+        return len(self.strings) - 1
+
+
+class TokenStore:
+    def __init__(self, source: TokenSource) -> None:
+        self.source = source
+        self.kinds = array("b")
+        self.token_ids = array("b")
+        self.starts = array("q")
+        self.lengths = array("i")
+        self.values = array("q")
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def append(
+        self,
+        kind: TokenType,
+        token_id: TokenId,
+        start: int,
+        length: int,
+        value: int,
+    ) -> int:
+        self.kinds.append(kind)
+        self.token_ids.append(token_id)
+        self.starts.append(start)
+        self.lengths.append(length)
+        self.values.append(value)
+        return len(self.kinds) - 1
+
+
 class Token:
-    kind: Optional[TokenType] = None
-    value: Optional[int] = None
-    location: Optional[int] = None
-    length: Optional[int] = None
-    expression: Optional[str] = None
-    original_expression: Optional[str] = None
-    str_value: Optional[str] = None
-    str_type: Optional["Type"] = None
-    line_number: int = 0
+    __slots__ = ("store", "index", "kind", "token_id")
+
+    def __init__(
+        self, store: TokenStore, index: int, kind: TokenType, token_id: TokenId
+    ) -> None:
+        self.store = store
+        self.index = index
+        self.kind = kind
+        self.token_id = token_id
+
+    @property
+    def value(self) -> Optional[int]:
+        if self.kind != TokenType.Number:
+            return None
+        return self.store.values[self.index]
+
+    @property
+    def location(self) -> int:
+        return self.store.starts[self.index]
+
+    @property
+    def length(self) -> int:
+        return self.store.lengths[self.index]
+
+    @property
+    def expression(self) -> Optional[str]:
+        if self.kind == TokenType.STRING or self.kind == TokenType.EOF:
+            return None
+        if self.kind == TokenType.Number:
+            start = self.store.starts[self.index]
+            return self.store.source.expression[start : start + self.length]
+        return self.store.source.names[self.store.values[self.index]]
+
+    @property
+    def original_expression(self) -> str:
+        return self.store.source.expression
+
+    @property
+    def str_value(self) -> Optional[str]:
+        if self.kind != TokenType.STRING:
+            return None
+        return self.store.source.strings[self.store.values[self.index]][0]
+
+    @property
+    def str_type(self) -> Optional[Type]:
+        if self.kind != TokenType.STRING:
+            return None
+        return self.store.source.strings[self.store.values[self.index]][1]
 
+    @property
+    def line_number(self) -> int:
+        return self.store.source.line_index.line_number(self.location)
 
-def new_token(
-    token_type: Optional[TokenType] = None, start: int = 0, end: int = 0
-) -> Token:
-    return Token(token_type, None, start, end - start, None, None)
+    def __repr__(self) -> str:
+        return f"Token({self.kind!r}, {self.expression!r}, line {self.line_number})"
 
 
 def get_number(token: Token) -> int:
@@ -43,9 +203,9 @@ def get_number(token: Token) -> int:
     return token.value
 
 
-def equal(token: Token, expression: str) -> bool:
-    return token.expression == expression
+def equal(token: Token, token_id: TokenId) -> bool:
+    return token.token_id is token_id
 
 
-def skip(token: Token, expression: str) -> None:
-    assert token.expression == expression
+def skip(token: Token, token_id: TokenId) -> None:
+    assert token.token_id is token_id
@@ -1,21 +1,51 @@
-import string
-from typing import Optional
-
-from nadeshiko.helper import error_message
-from nadeshiko.token import TokenType, Token, new_token, equal
+import re
+from typing import Optional, Callable, Iterator
+
+from nadeshiko.helper import error_message, wrap_int64
+from nadeshiko.token import (
+    TokenType,
+    Token,
+    TokenSource,
+    TokenStore,
+    TOKEN_CHUNK_SIZE,
+    equal,
+    TokenId,
+    PUNCTUATOR_IDS,
+    KEYWORD_IDS,
+    FIXED_NAME_INDEXES,
+)
 from nadeshiko.type import array_of, TYPE_CHAR
 from nadeshiko.utils import Peekable
 
-
-def get_punctuator_length(expression: str) -> int:
-    if (
-        expression.startswith("==")
-        or expression.startswith("!=")
-        or expression.startswith("<=")
-        or expression.startswith(">=")
-    ):
-        return 2
-    return 1 if expression[0] in string.printable else 0
+TOKEN_PATTERN = re.compile(
+    r"""
+    [ \n]*
+    (?:
+    (?P<end>\Z)
+    | (?P<line_comment>//[^\n]*)
+    | (?P<block_comment>/\*.*?\*/)
+    | (?P<unterminated_comment>/\*)
+    | (?P<string>"(?:[^"\\\n\0]|\\.)*")
+    | (?P<unterminated_string>")
+    | (?P<number>\d+)
+    | (?P<keyword>(?:return|if|else|while|for|int|sizeof|char)\b)
+    | (?P<identifier>[^\W\d_]\w*)
+    | (?P<punctuator>==|!=|<=|>=|[!-~\t\r\x0b\x0c])
+    )
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+SKIPPED_GROUPS = frozenset({"end", "line_comment", "block_comment"})
+
+KEYWORD_TOKENS = {
+    text: (TokenType.Keyword, token_id, FIXED_NAME_INDEXES[text])
+    for text, token_id in KEYWORD_IDS.items()
+}
+PUNCTUATOR_TOKENS = {
+    text: (TokenType.Punctuator, token_id, FIXED_NAME_INDEXES[text])
+    for text, token_id in PUNCTUATOR_IDS.items()
+}
 
 
 def from_hex(char: str) -> int:
@@ -72,132 +102,114 @@ def read_escape_char(expression: str, index: int) -> tuple[str, int]:
             return expression[index], 1
 
 
-def read_string_literal(expression: str, index: int) -> tuple[Token, int]:
-    end = -1
-    i = index + 1
-    while i <= len(expression):
-        if expression[i] == '"':
-            end = i
-            break
-        if expression[i] == "\0" or expression[i] == "\n":
-            print(error_message(expression, index, "unterminated string"))
-            exit(1)
-        if expression[i] == "\\":
-            i += 1
-        i += 1
-    length = 0
-    results = []
-    i = index + 1
-    while i < end:
-        if expression[i] != '"':
+def read_string_literal(
+    source: TokenSource, expression: str, start: int, end: int
+) -> tuple[TokenType, TokenId, int]:
+    body = expression[start + 1 : end - 1]
+    if "\\" not in body:
+        str_value = body + "\0"
+        length = len(body)
+    else:
+        results = []
+        i = start + 1
+        while i < end - 1:
             if expression[i] == "\\":
                 value, offset = read_escape_char(expression, i + 1)
                 results.append(value)
                 i += offset
-                length += 1
-            else:
+            elif expression[i] != '"':
                 results.append(expression[i])
-                length += 1
-        i += 1
-    results.append("\0")
-    str_value = "".join(results)
+            i += 1
+        length = len(results)
+        results.append("\0")
+        str_value = "".join(results)
+    index = source.add_string(str_value, array_of(TYPE_CHAR, length + 1))
+    return TokenType.STRING, TokenId.Other, index
 
-    token = new_token(TokenType.STRING, index, end + 1)
-    token.str_type = array_of(TYPE_CHAR, length + 1)
-    token.str_value = str_value
-    return token, end + 1
 
+def read_number(
+    source: TokenSource, expression: str, start: int, end: int
+) -> tuple[TokenType, TokenId, int]:
+    return TokenType.Number, TokenId.Other, wrap_int64(int(expression[start:end]))
 
-def is_keyword(token: Token) -> bool:
-    keywords = {"return", "if", "else", "while", "for", "int", "sizeof", "char"}
-    if token.expression in keywords:
-        return True
-    return False
 
+def read_keyword(
+    source: TokenSource, expression: str, start: int, end: int
+) -> tuple[TokenType, TokenId, int]:
+    return KEYWORD_TOKENS[expression[start:end]]
 
-def convert_keyword(tokens: list[Optional[Token]]) -> None:
-    for token in tokens:
-        if is_keyword(token):
-            token.kind = TokenType.Keyword
 
+def read_identifier(
+    source: TokenSource, expression: str, start: int, end: int
+) -> tuple[TokenType, TokenId, int]:
+    return (
+        TokenType.Identifier,
+        TokenId.Other,
+        source.intern_name(expression[start:end]),
+    )
+
+
+def read_punctuator(
+    source: TokenSource, expression: str, start: int, end: int
+) -> tuple[TokenType, TokenId, int]:
+    text = expression[start:end]
+    if (token := PUNCTUATOR_TOKENS.get(text)) is not None:
+        return token
+    return TokenType.Punctuator, TokenId.Other, source.intern_name(text)
+
+
+def unterminated_comment(
+    source: TokenSource, expression: str, start: int, end: int
+) -> tuple[TokenType, TokenId, int]:
+    print(error_message(expression, start, "unterminated comment"))
+    exit(1)
 
-def add_line_number(expression: str, tokens: list[Optional[Token]]) -> None:
-    line_number = 1
-    token_index = 0
-    index = 0
-    while index < len(expression):
-        if index == tokens[token_index].location:
-            tokens[token_index].line_number = line_number
-            token_index += 1
-        if expression[index] == "\n":
-            line_number += 1
-        index += 1
 
+def unterminated_string(
+    source: TokenSource, expression: str, start: int, end: int
+) -> tuple[TokenType, TokenId, int]:
+    print(error_message(expression, start, "unterminated string"))
+    exit(1)
 
-def tokenize(expression: str) -> Peekable[Optional[Token]]:
+
+TokenReader = Callable[[TokenSource, str, int, int], tuple[TokenType, TokenId, int]]
+
+TOKEN_READERS: dict[str, TokenReader] = {
+    "string": read_string_literal,
+    "number": read_number,
+    "keyword": read_keyword,
+    "identifier": read_identifier,
+    "punctuator": read_punctuator,
+    "unterminated_comment": unterminated_comment,
+    "unterminated_string": unterminated_string,
+}
+
+
+def tokenize(expression: str) -> Iterator[Token]:
+    match_token = TOKEN_PATTERN.match
+    source = TokenSource(expression)
+    store = TokenStore(source)
     index = 0
-    tokens = []
     while index < len(expression):
-        if index <= len(expression) - 2 and expression[index : index + 2] == "//":
-            index += 2
-            while index < len(expression) and expression[index] != "\n":
-                index += 1
-            continue
-        if index <= len(expression) - 2 and expression[index : index + 2] == "/*":
-            try:
-                index = expression.find("*/", index + 2) + 2
-            except ValueError:
-                print(error_message(expression, index, "unterminated comment"))
-                exit(1)
-        if expression[index] == " " or expression[index] == "\n":
-            index += 1
-            continue
-        if expression[index] == '"':
-            token, index = read_string_literal(expression, index)
-            tokens.append(token)
-            continue
-        if expression[index].isdigit():
-            current = new_token(TokenType.Number, index, index)
-            tokens.append(current)
-            temp = []
-            while index < len(expression) and expression[index].isdigit():
-                temp.append(expression[index])
-                index += 1
-            current.value = int("".join(temp))
-            current.length = index - current.location
-            current.expression = expression[
-                current.location : current.location + current.length
-            ]
-            current.original_expression = expression
-            continue
-        if expression[index].isalpha():
-            end = index
-            while expression[end].isalnum() or expression[end] == "_":
-                end += 1
-            current = new_token(TokenType.Identifier, index, end)
-            tokens.append(current)
-            current.expression = expression[index:end]
-            index = end
-            continue
-        if (length := get_punctuator_length(expression[index:])) >= 1:
-            current = new_token(TokenType.Punctuator, index, index + length)
-            tokens.append(current)
-            current.expression = expression[
-                current.location : current.location + current.length
-            ]
-            current.original_expression = expression
-            index += length
+        match = match_token(expression, index)
+        if match is None:
+            print(error_message(expression, index, "invalid token"))
+            exit(1)
+        group = match.lastgroup
+        start, index = match.span(group)
+        if group in SKIPPED_GROUPS:
             continue
-        print(error_message(expression, index, "invalid token"))
-        exit(1)
-    tokens.append(new_token(TokenType.EOF, index, index))
-    add_line_number(expression, tokens)
-    convert_keyword(tokens)
-    return Peekable(tokens)
+        kind, token_id, value = TOKEN_READERS[group](source, expression, start, index)
+        position = store.append(kind, token_id, start, index - start, value)
+        yield Token(store, position, kind, token_id)
+        if position == TOKEN_CHUNK_SIZE - 1:
+            store = TokenStore(source)
+    position = store.append(TokenType.EOF, TokenId.Other, index, 0, 0)
+    yield Token(store, position, TokenType.EOF, TokenId.Other)
 
 
-def consume(tokens: Peekable[Optional[Token]], expression: str) -> bool:
-    if equal(tokens.peek(), expression):
+def consume(tokens: Peekable[Optional[Token]], token_id: TokenId) -> bool:
+    if equal(tokens.peek(), token_id):
         next(tokens)
         return True
     return False
@@ -11,16 +11,19 @@ class TypeKind(IntEnum):
     TYPE_CHAR = 5
 
 
-@dataclass
+@dataclass(eq=False, slots=True)
 class Type:
     kind: TypeKind = None
     base: Optional["Type"] = None
-    name: Optional[str] = None
     return_type: Optional["Type"] = None
-    params: list[Optional["Type"]] = field(default_factory=list)
-    next_type: Optional["Type"] = None
+    params: tuple["Type", ...] = ()
     size: int = 0
     array_len: int = 0
+    pointer: Optional["Type"] = field(default=None, repr=False)
+    arrays: Optional[dict[int, "Type"]] = field(default=None, repr=False)
+    functions: Optional[dict[tuple["Type", ...], "Type"]] = field(
+        default=None, repr=False
+    )
 
 
 TYPE_INT = Type(TypeKind.TYPE_INT, size=8)
@@ -31,26 +34,31 @@ def is_integer(ty: Type) -> bool:
     return ty.kind == TypeKind.TYPE_CHAR or ty.kind == TypeKind.TYPE_INT
 
 
+def align_of(ty: Type) -> int:
+    while ty.kind == TypeKind.TYPE_ARRAY:
+        ty = ty.base
+    return ty.size
+
+
 def pointer_to(base: Type) -> Type:
-    return Type(TypeKind.TYPE_PTR, base, size=8)
+    if base.pointer is None:
+        base.pointer = Type(TypeKind.TYPE_PTR, base, size=8)
+    return base.pointer
 
 
-def function_type(return_type: Type) -> Type:
-    return Type(TypeKind.TYPE_FUNCTION, return_type)
+def function_type(return_type: Type, params: tuple[Type, ...] = ()) -> Type:
+    if return_type.functions is None:
+        return_type.functions = {}
+    if (ty := return_type.functions.get(params)) is None:
+        ty = Type(TypeKind.TYPE_FUNCTION, return_type=return_type, params=params)
+        return_type.functions[params] = ty
+    return ty
 
 
 def array_of(base: Type, length: int) -> Type:
-    return Type(TypeKind.TYPE_ARRAY, base, size=base.size * length, array_len=length)
-
-
-def copy_type(ty: Type) -> Type:
-    return Type(
-        ty.kind,
-        ty.base,
-        ty.name,
-        ty.return_type,
-        ty.params,
-        ty.next_type,
-        ty.size,
-        ty.array_len,
-    )
+    if base.arrays is None:
+        base.arrays = {}
+    if (ty := base.arrays.get(length)) is None:
+        ty = Type(TypeKind.TYPE_ARRAY, base, size=base.size * length, array_len=length)
+        base.arrays[length] = ty
+    return ty
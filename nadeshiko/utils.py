@@ -12,6 +12,7 @@ class Peekable(Generic[T], Iterator[T]):
     def __init__(self, iterable: Iterable[T]):
         self._it = iter(iterable)
         self._cache = deque()
+        self._history: Optional[list[T]] = None
 
     def __iter__(self) -> Self:
         return self
@@ -44,8 +45,19 @@ class Peekable(Generic[T], Iterator[T]):
     def prepend(self, *items: T):
         self._cache.extendleft(reversed(items))
 
+    def mark(self) -> None:
+        assert self._history is None
+        self._history = []
+
+    def rewind(self) -> None:
+        history, self._history = self._history, None
+        self.prepend(*history)
+
     def __next__(self) -> T:
         if self._cache:
-            return self._cache.popleft()
-
-        return next(self._it)
+            item = self._cache.popleft()
+        else:
+            item = next(self._it)
+        if self._history is not None:
+            self._history.append(item)
+        return item
@@ -31,6 +31,52 @@ int main() {
   ASSERT(1, 1>=1);
   ASSERT(0, 1>=2);
 
+  ASSERT(11, (((20-2)-(3+1))-((2+1)-(1+1)))-(5-3));
+  ASSERT(7, (((20-2)-(3+1))*((2+1)-(1+1)))/(5-3));
+  ASSERT(0, (((20-2)-(3+1))-((2+1)-(1+1)))<(5-3));
+  ASSERT(1, (((1+1)-(1+1))-((1+1)-(1+1)))<=(1-1));
+  ASSERT(64, ((((((1+1)+(1+1))+((1+1)+(1+1)))+(((1+1)+(1+1))+((1+1)+(1+1))))+((((1+1)+(1+1))+((1+1)+(1+1)))+(((1+1)+(1+1))+((1+1)+(1+1)))))+(((((1+1)+(1+1))+((1+1)+(1+1)))+(((1+1)+(1+1))+((1+1)+(1+1))))+((((1+1)+(1+1))+((1+1)+(1+1)))+(((1+1)+(1+1))+((1+1)+(1+1)))))));
+  ASSERT(0, (9223372036854775807+1)+(9223372036854775807+1));
+  ASSERT(10, - -10);
+  ASSERT(-50, ({ int x=0; x=-100; x/2; }));
+  ASSERT(-33, ({ int x=0; x=-100; x/3; }));
+  ASSERT(-14, ({ int x=0; x=-100; x/7; }));
+  ASSERT(-12, ({ int x=0; x=-100; x/8; }));
+  ASSERT(-10, ({ int x=0; x=-100; x/10; }));
+  ASSERT(33, ({ int x=0; x=-100; x/-3; }));
+  ASSERT(12, ({ int x=0; x=-100; x/-8; }));
+  ASSERT(-700, ({ int x=0; x=-100; x*7; }));
+  ASSERT(-1000, ({ int x=0; x=-100; x*10; }));
+  ASSERT(-900, ({ int x=0; x=-100; x*9; }));
+  ASSERT(-2400, ({ int x=0; x=-100; x*24; }));
+  ASSERT(300, ({ int x=0; x=-100; x*-3; }));
+  ASSERT(800, ({ int x=0; x=-100; x*-8; }));
+  ASSERT(50, ({ int x=0; x=100; x/2; }));
+  ASSERT(33, ({ int x=0; x=100; x/3; }));
+  ASSERT(14, ({ int x=0; x=100; x/7; }));
+  ASSERT(12, ({ int x=0; x=100; x/8; }));
+  ASSERT(10, ({ int x=0; x=100; x/10; }));
+  ASSERT(-33, ({ int x=0; x=100; x/-3; }));
+  ASSERT(-12, ({ int x=0; x=100; x/-8; }));
+  ASSERT(700, ({ int x=0; x=100; x*7; }));
+  ASSERT(1000, ({ int x=0; x=100; x*10; }));
+  ASSERT(900, ({ int x=0; x=100; x*9; }));
+  ASSERT(2400, ({ int x=0; x=100; x*24; }));
+  ASSERT(-300, ({ int x=0; x=100; x*-3; }));
+  ASSERT(-800, ({ int x=0; x=100; x*-8; }));
+  ASSERT(3, ({ int x=0; x=7; x/2; }));
+  ASSERT(2, ({ int x=0; x=7; x/3; }));
+  ASSERT(1, ({ int x=0; x=7; x/7; }));
+  ASSERT(0, ({ int x=0; x=7; x/8; }));
+  ASSERT(0, ({ int x=0; x=7; x/10; }));
+  ASSERT(-2, ({ int x=0; x=7; x/-3; }));
+  ASSERT(0, ({ int x=0; x=7; x/-8; }));
+  ASSERT(49, ({ int x=0; x=7; x*7; }));
+  ASSERT(70, ({ int x=0; x=7; x*10; }));
+  ASSERT(63, ({ int x=0; x=7; x*9; }));
+  ASSERT(168, ({ int x=0; x=7; x*24; }));
+  ASSERT(-21, ({ int x=0; x=7; x*-3; }));
+  ASSERT(-56, ({ int x=0; x=7; x*-8; }));
   printf("OK\n");
   return 0;
 }
@@ -19,9 +19,18 @@ int main() {
 
   ASSERT(10, ({ int i=0; while(i<10) i=i+1; i; }));
   ASSERT(55, ({ int i=0; int j=0; while(i<=10) {j=i+j; i=i+1;} j; }));
+  ASSERT(49, ({ int a=1; int b=2; int c=3; int d=4; int e=5; int f=6; int g=7; int i=0; for (i=0; i<3; i=i+1) {a=a+b; g=g+a;} a+b+c+d+e+f+g; }));
   ASSERT(3, (1,2,3));
   ASSERT(5, ({ int i=2, j=3; (i=5,j)=6; i; }));
   ASSERT(6, ({ int i=2, j=3; (i=5,j)=6; j; }));
+  ASSERT(3, ({ int i=3; for (i=3; 0; i=i+1) i=i+1; i; }));
+  ASSERT(3, ({ int i=3; while (1-1) i=i+1; i; }));
+  ASSERT(5, ({ int x=0; int y=0; x=(y=5); y; }));
+  ASSERT(7, ({ int x=1; int y=7; x=x+1; x; y; }));
+  ASSERT(4, ({ int i=4; if (0) i=5; i; }));
+  ASSERT(2, ({ int i=0; for (i=0; i<2; i+1) i=i+1; i; }));
+  ASSERT(12, ({ int x[2][3]; int i=0; int j=1; int t=0; x[1][0]=1; x[1][1]=2; x[1][2]=3; for (i=0; i<3; i=i+1) t=t+x[j][i]; t+t; }));
+  ASSERT(7, ({ int x[3]; int i=0; int j=0; int t=0; x[0]=1; x[1]=2; x[2]=6; for (i=0; i<2; i=i+1) { t=t+x[j+i]; j=1; } t; }));
   printf("OK\n");
   return 0;
 }
@@ -18,6 +18,51 @@ python main.py -o $tmp/out $tmp/empty.c
 [ -f $tmp/out ]
 check -o
 
+# stdout
+python main.py $tmp/empty.c | grep -q ".file 1"
+check stdout
+
+# -g
+echo 'int main() { return 0; }' > $tmp/main.c
+! python main.py -g0 $tmp/main.c | grep -q "\.loc"
+check -g0
+python main.py -g1 $tmp/main.c | grep -q "\.loc 1 1$"
+check -g1
+python main.py -g2 $tmp/main.c | grep -q "\.loc 1 1 21$"
+check -g2
+
+# -c
+echo 'int main() { return 3; }' > $tmp/three.c
+python main.py -c -o $tmp/three.o $tmp/three.c
+cc -o $tmp/three $tmp/three.o
+$tmp/three
+[ $? -eq 3 ]
+check -c
+
+# --run
+python main.py --run $tmp/three.c
+[ $? -eq 3 ]
+check --run
+echo 'int main() { printf("run"); return 0; }' > $tmp/print.c
+python main.py --run $tmp/print.c | grep -q "^run$"
+check "--run stdout"
+
+# --emit-ir
+python main.py --emit-ir $tmp/main.c | grep -q "^function main() {$"
+check --emit-ir
+
+# deep expressions
+python -c "print('int main() { int x=1; return ' + '+'.join(['x'] * 20000) + '; }')" > $tmp/sum.c
+python main.py --run $tmp/sum.c
+[ $? -eq 32 ]
+check "deep expression"
+python main.py -O --run $tmp/sum.c
+[ $? -eq 32 ]
+check "deep expression -O"
+python -c "print('int main() { return ' + '(' * 200 + '1' + ')' * 200 + '; }')" > $tmp/paren.c
+python main.py $tmp/paren.c | grep -q "nesting too deep"
+check "nesting too deep"
+
 # --help
 python main.py --help 2>&1 | grep -q "main.py"
 check --help
@@ -35,6 +35,12 @@ int main() {
   ASSERT(0, "\x00"[0]);
   ASSERT(119, "\x77"[0]);
 
+  ASSERT(2, sizeof("€"));
+  ASSERT(-84, "€"[0]);
+  ASSERT(0, "€"[1]);
+  ASSERT(120, "€x"[1]);
+  ASSERT(-84, "\x20ac"[0]);
+
   printf("OK\n");
   return 0;
 }
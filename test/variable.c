@@ -28,6 +28,7 @@ int main() {
 
   ASSERT(0, g1);
   ASSERT(3, ({ g1=3; g1; }));
+  ASSERT(6, ({ int *p=&g1; int i=0; int s=0; for (i=0; i<4; i=i+1) s=s+i; *p=s; g1; }));
   ASSERT(0, ({ g2[0]=0; g2[1]=1; g2[2]=2; g2[3]=3; g2[0]; }));
   ASSERT(1, ({ g2[0]=0; g2[1]=1; g2[2]=2; g2[3]=3; g2[1]; }));
   ASSERT(2, ({ g2[0]=0; g2[1]=1; g2[2]=2; g2[3]=3; g2[2]; }));